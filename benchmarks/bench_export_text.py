@@ -0,0 +1,68 @@
+"""Micro-benchmark: per-document setup cost of markdown_to_text().
+
+Compares building a fresh Markdown instance + PlainTextExtractor per
+document (the previous behaviour) with the reused, reset() converter.
+
+    python -m benchmarks.bench_export_text
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import markdown
+
+from scripts.export_text import (
+    ACTIONS_BLOCK,
+    GAMES_DIR,
+    MARKDOWN_EXTENSIONS,
+    PlainTextExtractor,
+    markdown_to_text,
+)
+
+TINY_DOCUMENT = '# 18Tiny サマリー\n\n=== "SR"\n\n    - 株を買う\n'
+
+
+def _fresh_markdown_to_text(content: str) -> str:
+    cleaned = ACTIONS_BLOCK.sub("", content)
+    html = markdown.markdown(cleaned, extensions=MARKDOWN_EXTENSIONS, output_format="html5")
+    parser = PlainTextExtractor()
+    parser.feed(html)
+    return parser.get_text()
+
+
+def _time_per_document(convert: Callable[[str], str], documents: list[str], rounds: int) -> float:
+    convert(documents[0])
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for document in documents:
+            convert(document)
+    return (time.perf_counter() - start) / (rounds * len(documents))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over each corpus.")
+    args = parser.parse_args()
+
+    games = [
+        path.read_text(encoding="utf-8")
+        for path in sorted(GAMES_DIR.glob("*.md"))
+        if path.stem != "index"
+    ]
+    corpora = {"tiny": [TINY_DOCUMENT] * 50}
+    if games:
+        corpora["games"] = games
+
+    for name, documents in corpora.items():
+        fresh = _time_per_document(_fresh_markdown_to_text, documents, args.rounds)
+        reused = _time_per_document(markdown_to_text, documents, args.rounds)
+        print(
+            f"{name:>6}: fresh {fresh * 1e3:8.3f} ms/doc, reused {reused * 1e3:8.3f} ms/doc, "
+            f"setup saved {(fresh - reused) * 1e3:8.3f} ms/doc ({fresh / reused:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
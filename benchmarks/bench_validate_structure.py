@@ -0,0 +1,82 @@
+"""Benchmark: structure validation over a synthetic game tree.
+
+Builds a temporary synthetic catalogue (benchmarks/catalogue.py) with N
+docs/_template.md-shaped pages (10,000 by default), then times the
+single-pass scanner against a copy of the scan it replaced (title/actions
+regex searches, download patterns on the actions body, tab finditer), and
+the full run_validation().
+
+    python -m benchmarks.bench_validate_structure --pages 10000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.catalogue import write_catalogue
+from scripts.validate_structure import (
+    DOWNLOAD_HREF_PATTERN,
+    DOWNLOAD_MACRO_PATTERN,
+    run_validation,
+    scan_game_content,
+)
+
+# 置き換え前の validate_game_file と同じ照合（比較用）。
+LEGACY_TITLE_PATTERN = re.compile(r"^#\s+.+\s+サマリー\s*$", re.MULTILINE)
+LEGACY_ACTION_BLOCK_PATTERN = re.compile(r'<div class="actions">(?P<body>.*?)</div>', re.DOTALL)
+LEGACY_TAB_PATTERN = re.compile(r'^===\s+"([^"]+)"\s*$', re.MULTILINE)
+
+
+def _legacy_scan(content: str) -> tuple[bool, str | None, bool, str | None, list[str]]:
+    has_title = LEGACY_TITLE_PATTERN.search(content) is not None
+    action_match = LEGACY_ACTION_BLOCK_PATTERN.search(content)
+    body = action_match.group("body") if action_match else None
+    has_print = body is not None and "{{ print_button() }}" in body
+    download = None
+    if body is not None:
+        download = DOWNLOAD_MACRO_PATTERN.search(body) or DOWNLOAD_HREF_PATTERN.search(body)
+    tabs = [match.group(1) for match in LEGACY_TAB_PATTERN.finditer(content)]
+    return has_title, body, has_print, download and download.group(1), tabs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10_000, help="Number of synthetic pages.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        catalogue = write_catalogue(Path(td), args.pages)
+        contents = [path.read_text(encoding="utf-8") for path in catalogue.page_paths()]
+
+        start = time.perf_counter()
+        for content in contents:
+            _legacy_scan(content)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for content in contents:
+            scan_game_content(content)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = run_validation(
+            games_dir=catalogue.games_dir,
+            pages_path=catalogue.pages_path,
+            index_path=catalogue.index_path,
+        )
+        full = time.perf_counter() - start
+
+    print(f"pages: {args.pages}")
+    print(f"previous scan        : {legacy:8.3f} s")
+    print(f"single-pass scan     : {single:8.3f} s ({legacy / single:4.2f}x)")
+    print(
+        f"run_validation       : {full:8.3f} s "
+        f"({len(summary.errors)} error(s), {len(summary.warnings)} warning(s))"
+    )
+
+
+if __name__ == "__main__":
+    main()
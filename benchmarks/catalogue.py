@@ -0,0 +1,154 @@
+"""Synthetic game catalogues for the benchmarks.
+
+Pages are rendered from docs/_template.md (frontmatter with bgg_id, the
+game name filled in, download_link enabled), alongside a matching .pages,
+a game_card() index, bgg-meta.json and empty cover files, so every
+pipeline stage sees a tree shaped like the real site.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+TEMPLATE_PATH = Path("docs/_template.md")
+CATALOGUE_SIZES = (100, 1_000, 10_000)
+TEMPLATE_NAME = "[ゲーム名]"
+COMMENTED_DOWNLOAD = '<!-- {{ download_link("[ゲーム名].txt") }} -->'
+ENABLED_DOWNLOAD = '{{ download_link("[ゲーム名].txt") }}'
+# 幅 8px の WebP プレビューに相当する長さのダミー（main.py の PLACEHOLDER_IMAGE に合う形）。
+PLACEHOLDER_IMAGE = "data:image/webp;base64," + base64.b64encode(bytes(range(90))).decode("ascii")
+DESIGNERS = ("Francis Tresham", "Ian D. Wilson", "Mike Hutton", "Tom Lehmann", "Bill & Ted")
+DESCRIPTION = "架空の路線網を舞台にした18xx。株式ラウンドと運営ラウンドを繰り返し、<大型会社>への合併を目指します。"
+
+
+@dataclass(frozen=True)
+class Catalogue:
+    root: Path
+    games_dir: Path
+    pages_path: Path
+    index_path: Path
+    meta_path: Path
+    covers_dir: Path
+    # game_card() に渡す引数（index.md と同じ順）。
+    cards: list[tuple[str, str, str, str, str]]
+
+    def page_paths(self) -> list[Path]:
+        return sorted(path for path in self.games_dir.glob("*.md") if path.stem != "index")
+
+
+def render_page(template: str, stem: str, bgg_id: str) -> str:
+    body = template.replace(COMMENTED_DOWNLOAD, ENABLED_DOWNLOAD).replace(TEMPLATE_NAME, stem)
+    return f"---\nbgg_id: {bgg_id}\n---\n\n{body}"
+
+
+def synthetic_meta(index: int, bgg_id: str, rng: random.Random) -> dict:
+    """index % 4 で cover の形（縮小版+プレビュー / AVIF 付き / 本体のみ / なし）を切り替える。"""
+    players_min = rng.randint(2, 3)
+    time_min = rng.choice((60, 90, 120, 180))
+    meta: dict = {
+        "name": f"18Bench {index}",
+        "players": {"min": players_min, "max": players_min + rng.randint(0, 4)},
+        "playing_time": {"min": time_min, "max": time_min + rng.choice((0, 60, 120))},
+        "year_published": rng.randint(1974, 2025),
+        "min_age": rng.choice((0, 12, 14)),
+        "designers": rng.sample(DESIGNERS, rng.randint(1, 2)),
+    }
+    kind = index % 4
+    if kind == 3:
+        return meta
+    height = rng.randint(480, 720)
+    cover: dict = {
+        "path": f"assets/game-covers/{bgg_id}.webp",
+        "width": 480,
+        "height": height,
+        "source": "image",
+    }
+    if kind in (0, 1):
+        variants = [
+            {
+                "path": f"assets/game-covers/{bgg_id}-{width}w.webp",
+                "width": width,
+                "height": height * width // 480,
+                "type": "image/webp",
+            }
+            for width in (160, 320)
+        ]
+        if kind == 1:
+            variants += [
+                {
+                    "path": f"assets/game-covers/{bgg_id}{suffix}.avif",
+                    "width": width,
+                    "height": height * width // 480,
+                    "type": "image/avif",
+                }
+                for suffix, width in (("-160w", 160), ("-320w", 320), ("", 480))
+            ]
+        cover["variants"] = variants
+        cover["placeholder"] = {"color": f"#{rng.randrange(0x1000000):06x}"}
+        if kind == 0:
+            cover["placeholder"]["image"] = PLACEHOLDER_IMAGE
+    meta["cover"] = cover
+    return meta
+
+
+def write_catalogue(root: Path, games: int, seed: int = 0) -> Catalogue:
+    """root/docs 以下に games 件のゲームを持つサイトを書き出す。
+
+    10 件に 1 件は bgg-meta.json に載せず、メタ情報のないカードも混ぜる。
+    """
+    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    rng = random.Random(seed)
+    games_dir = root / "docs" / "games"
+    covers_dir = root / "docs" / "assets" / "game-covers"
+    games_dir.mkdir(parents=True)
+    covers_dir.mkdir(parents=True)
+
+    meta: dict[str, dict] = {}
+    cards: list[tuple[str, str, str, str, str]] = []
+    for index in range(games):
+        stem = f"18Bench{index:05d}"
+        bgg_id = str(100_000 + index)
+        (games_dir / f"{stem}.md").write_text(render_page(template, stem, bgg_id), encoding="utf-8")
+        cards.append(
+            (bgg_id, stem, DESCRIPTION, f"https://boardgamegeek.com/boardgame/{bgg_id}", f"{stem}/")
+        )
+        if index % 10 == 9:
+            continue
+        entry = synthetic_meta(index, bgg_id, rng)
+        meta[bgg_id] = entry
+        cover = entry.get("cover")
+        if cover:
+            for path in (cover["path"], *(variant["path"] for variant in cover.get("variants", ()))):
+                (root / "docs" / path).touch()
+
+    pages_path = games_dir / ".pages"
+    nav = "".join(f"  - {card[1]}.md\n" for card in cards)
+    pages_path.write_text(f"title: ゲーム一覧\nnav:\n  - index.md\n{nav}", encoding="utf-8")
+
+    index_path = games_dir / "index.md"
+    entries = "".join(
+        f'  {{{{ game_card("{bgg_id}", "{title}", "{description}", "{bgg_href}", "{href}") }}}}\n'
+        for bgg_id, title, description, bgg_href, href in cards
+    )
+    index_path.write_text(
+        f'# ゲーム一覧\n\n<section class="game-list" aria-label="ゲーム一覧">\n{entries}</section>\n',
+        encoding="utf-8",
+    )
+
+    meta_path = root / "docs" / "assets" / "bgg-meta.json"
+    with meta_path.open("w", encoding="utf-8", newline="\n") as handle:
+        json.dump(meta, handle, ensure_ascii=False, indent=2, sort_keys=True)
+        handle.write("\n")
+
+    return Catalogue(
+        root=root,
+        games_dir=games_dir,
+        pages_path=pages_path,
+        index_path=index_path,
+        meta_path=meta_path,
+        covers_dir=covers_dir,
+        cards=cards,
+    )
@@ -0,0 +1,222 @@
+"""Benchmark suite: build-pipeline stages over synthetic catalogues.
+
+Generates catalogues of 100 / 1,000 / 10,000 games (benchmarks/catalogue.py)
+and times export_text.markdown_to_text, validate_structure.run_validation,
+indent_tabs.indent_tabs_in_content and the main.py game_card() macro. Each
+case keeps the best of --repeat runs and is compared with the stored
+baseline; a case slower than baseline * (1 + --threshold) fails the run.
+export_text only runs on catalogues of up to 1,000 games unless --slow.
+
+    python -m benchmarks.run                      # compare with benchmarks/baseline.json
+    python -m benchmarks.run --sizes 100 1000     # smaller catalogues only
+    python -m benchmarks.run --update-baseline    # re-record on this machine
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.catalogue import CATALOGUE_SIZES, Catalogue, write_catalogue
+from scripts.export_text import markdown_to_text
+from scripts.indent_tabs import indent_tabs_in_content
+from scripts.validate_structure import run_validation
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+BASELINE_VERSION = 1
+# ベースラインより 25% 以上遅ければ回帰とみなす。
+REGRESSION_THRESHOLD = 0.25
+# 重いケースは、--slow を付けない限りこの件数までのカタログでだけ測る。
+SLOW_CASE_MAX_GAMES = {"export_text": 1_000}
+
+
+def _time_export_text(catalogue: Catalogue) -> float:
+    contents = [path.read_text(encoding="utf-8") for path in catalogue.page_paths()]
+    start = time.perf_counter()
+    for content in contents:
+        markdown_to_text(content)
+    return time.perf_counter() - start
+
+
+def _time_indent_tabs(catalogue: Catalogue) -> float:
+    contents = [path.read_text(encoding="utf-8") for path in catalogue.page_paths()]
+    start = time.perf_counter()
+    for content in contents:
+        indent_tabs_in_content(content)
+    return time.perf_counter() - start
+
+
+def _time_validate_structure(catalogue: Catalogue) -> float:
+    start = time.perf_counter()
+    summary = run_validation(
+        games_dir=catalogue.games_dir,
+        pages_path=catalogue.pages_path,
+        index_path=catalogue.index_path,
+    )
+    elapsed = time.perf_counter() - start
+    if summary.has_errors():
+        raise RuntimeError(f"synthetic catalogue failed validation: {summary.errors[0].format()}")
+    return elapsed
+
+
+class _MacroEnv:
+    def __init__(self) -> None:
+        self.macros: dict[str, Callable[..., str]] = {}
+        self.conf: dict = {}
+
+    def macro(self, fn: Callable[..., str]) -> Callable[..., str]:
+        self.macros[fn.__name__] = fn
+        return fn
+
+
+def _time_macros(catalogue: Catalogue) -> float:
+    # 計測ごとに読み込み直し、アイコンとフィールド表のキャッシュが空の状態から測る。
+    import main as main_module
+
+    importlib.reload(main_module)
+    main_module.BGG_META_PATH = catalogue.meta_path
+    main_module.COVERS_DIR = catalogue.covers_dir
+    env = _MacroEnv()
+    start = time.perf_counter()
+    main_module.define_env(env)
+    game_card = env.macros["game_card"]
+    for card in catalogue.cards:
+        game_card(*card)
+    return time.perf_counter() - start
+
+
+CASES: dict[str, Callable[[Catalogue], float]] = {
+    "export_text": _time_export_text,
+    "indent_tabs": _time_indent_tabs,
+    "validate_structure": _time_validate_structure,
+    "macros": _time_macros,
+}
+
+
+def run_suite(
+    sizes: list[int], cases: list[str], repeat: int, slow: bool = False
+) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as td:
+            catalogue = write_catalogue(Path(td), size)
+            for name in cases:
+                if not slow and size > SLOW_CASE_MAX_GAMES.get(name, size):
+                    print(f"{name:>18} {size:>6}: skipped (use --slow)", flush=True)
+                    continue
+                best = min(CASES[name](catalogue) for _ in range(repeat))
+                results[f"{name}/{size}"] = {"seconds": best, "per_game_ms": best * 1e3 / size}
+                print(f"{name:>18} {size:>6}: {best:8.3f} s ({best * 1e3 / size:7.3f} ms/game)", flush=True)
+    return results
+
+
+def load_baseline(path: Path) -> dict[str, dict[str, float]]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != BASELINE_VERSION:
+        return {}
+    cases = payload.get("cases")
+    return cases if isinstance(cases, dict) else {}
+
+
+def write_baseline(path: Path, results: dict[str, dict[str, float]]) -> None:
+    payload = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {
+            key: {name: round(value, 6) for name, value in result.items()}
+            for key, result in sorted(results.items())
+        },
+    }
+    with path.open("w", encoding="utf-8", newline="\n") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    regressions: list[str] = []
+    for key, result in sorted(results.items()):
+        previous = baseline.get(key)
+        if not isinstance(previous, dict) or not previous.get("seconds"):
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{key}: {result['seconds']:.3f} s vs baseline {previous['seconds']:.3f} s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(CATALOGUE_SIZES),
+        help="Catalogue sizes (number of games) to generate.",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=sorted(CASES),
+        default=list(CASES),
+        help="Cases to run.",
+    )
+    parser.add_argument(
+        "--slow",
+        action="store_true",
+        help="Also run slow cases on catalogues above their default size limit.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is kept.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Allowed slowdown against the baseline (0.25 = 25%%).",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON path.")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Record these results as the baseline instead of comparing.",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.cases, max(1, args.repeat), slow=args.slow)
+
+    if args.update_baseline:
+        merged = {**load_baseline(args.baseline), **results}
+        write_baseline(args.baseline, merged)
+        print(f"Wrote baseline to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    missing = sorted(key for key in results if key not in baseline)
+    if missing:
+        print(f"No baseline for: {', '.join(missing)}")
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"[REGRESSION] {regression}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}.")
+        return 1
+    print(f"No regressions (threshold {args.threshold:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,50 @@ from __future__ import annotations
 
 import html
 import json
-import markdown
+import math
+import mmap
+import os
+import re
+import struct
+import time
+from collections.abc import Mapping
+from functools import lru_cache, wraps
 from pathlib import Path
+from typing import Callable, NamedTuple
+
+import markdown
 from material.extensions.emoji import to_svg, twemoji
+from mkdocs.plugins import get_plugin_logger
 
 BGG_META_PATH = Path("docs/assets/bgg-meta.json")
+# bgg-meta.json の索引（scripts/bgg_fetch.py --write-index が書く）。形式は bgg_fetch.py と揃える。
+# 分割レイアウト（--layout sharded）は BGG_META_PATH の拡張子を除いたディレクトリに置かれる。
+META_SHARDS_VERSION = 1
+META_INDEX_MAGIC = b"BGGMIDX1"
+META_INDEX_HEADER = struct.Struct("<8sQI")
+META_INDEX_RECORD = struct.Struct("<QQI")
+COVERS_DIR = Path("docs/assets/game-covers")
+COVER_PATH_PREFIX = "assets/game-covers/"
+# 一覧カードの画像列の幅（cards.css の .game-card の grid-template-columns と揃える）。
+COVER_SIZES = "6.25rem"
+# style 属性にそのまま埋め込むので、形式を満たす値だけを使う。
+PLACEHOLDER_COLOR = re.compile(r"#[0-9a-fA-F]{6}")
+PLACEHOLDER_IMAGE = re.compile(r"data:image/(?:webp|png|jpeg);base64,[A-Za-z0-9+/]+={0,2}")
+ICON_CACHE_SIZE = 256
+# マクロのプロファイル出力先。環境変数か mkdocs.yml の extra.macro_profile で指定すると有効になる。
+MACRO_PROFILE_ENV = "MACRO_PROFILE"
+# カード描画で必ず使うアイコン。define_env() 時に先に描画しておく。
+PREWARM_ICONS: tuple[tuple[str, str | None], ...] = (
+    ("material-train", None),
+    ("material-account-group", "game-card__chip-icon"),
+    ("material-timer-outline", "game-card__chip-icon"),
+    ("material-calendar", "game-card__detail-icon"),
+    ("material-calendar", "game-card__year-icon"),
+    ("material-badge-account", "game-card__detail-icon"),
+    ("material-draw", "game-card__detail-icon"),
+    ("material-file-document-outline", "game-card__cta-icon"),
+)
+log = get_plugin_logger("macros")
 _icon_md = markdown.Markdown(
     extensions=["pymdownx.emoji"],
     extension_configs={
@@ -18,7 +57,8 @@ _icon_md = markdown.Markdown(
 )
 
 
-def _material_icon(shortname: str, css_class: str | None = None) -> str:
+@lru_cache(maxsize=ICON_CACHE_SIZE)
+def _render_icon(shortname: str, css_class: str | None) -> str:
     try:
         rendered = _icon_md.convert(f":{shortname}:")
         _icon_md.reset()
@@ -33,6 +73,11 @@ def _material_icon(shortname: str, css_class: str | None = None) -> str:
     return f'<span class="{css_class}" aria-hidden="true">{rendered}</span>'
 
 
+def _material_icon(shortname: str, css_class: str | None = None) -> str:
+    # 位置引数に揃えてから引くことで、キャッシュキーを (shortname, css_class) に統一する。
+    return _render_icon(shortname, css_class)
+
+
 def _load_bgg_meta() -> dict[str, dict]:
     try:
         with BGG_META_PATH.open("r", encoding="utf-8") as handle:
@@ -44,6 +89,164 @@ def _load_bgg_meta() -> dict[str, dict]:
     return {}
 
 
+class StaleIndexError(ValueError):
+    pass
+
+
+class BggMetaIndex:
+    """bgg-meta.json と索引を mmap し、引かれた id の値だけを json.loads する。
+
+    索引は JSON のバイト数で対応を確かめ、さらに引くたびに値の直前が "<id>": であることを確かめる。
+    食い違えば（JSON だけ更新された等）全体を読み込む方式に切り替える。
+    使い終わったら close() で mmap を閉じる（Windows では開いている間 bgg-meta.json を置き換えられない）。
+    """
+
+    def __init__(self, json_path: Path, index_path: Path) -> None:
+        with json_path.open("rb") as json_handle, index_path.open("rb") as index_handle:
+            self._json = mmap.mmap(json_handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = mmap.mmap(index_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._fallback: dict[str, dict] | None = None
+        if len(self._index) < META_INDEX_HEADER.size:
+            raise StaleIndexError("index is truncated")
+        magic, json_size, count = META_INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != META_INDEX_MAGIC:
+            raise StaleIndexError("unknown index format")
+        if json_size != len(self._json):
+            raise StaleIndexError("index does not match bgg-meta.json")
+        if len(self._index) != META_INDEX_HEADER.size + count * META_INDEX_RECORD.size:
+            raise StaleIndexError("index is truncated")
+        self._count = count
+
+    def close(self) -> None:
+        """mmap を閉じる。閉じた後に引かれたら JSON 全体の読み込みに切り替わる。"""
+        self._json.close()
+        self._index.close()
+
+    def get(self, bgg_id: str) -> object:
+        if self._fallback is not None:
+            return self._fallback.get(bgg_id)
+        try:
+            return self._lookup(bgg_id)
+        except ValueError:
+            # StaleIndexError、索引の指す範囲が JSON として壊れている、または close() 済み。
+            self._fallback = _load_bgg_meta()
+            return self._fallback.get(bgg_id)
+
+    def _lookup(self, bgg_id: str) -> object:
+        if not (bgg_id.isascii() and bgg_id.isdigit()) or str(int(bgg_id)) != bgg_id:
+            return None
+        target = int(bgg_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            key, offset, length = META_INDEX_RECORD.unpack_from(
+                self._index, META_INDEX_HEADER.size + middle * META_INDEX_RECORD.size
+            )
+            if key < target:
+                low = middle + 1
+            elif key > target:
+                high = middle
+            else:
+                prefix = f'"{bgg_id}": '.encode("ascii")
+                if self._json[offset - len(prefix):offset] != prefix:
+                    raise StaleIndexError(f"index entry for {bgg_id} is stale")
+                return json.loads(self._json[offset:offset + length])
+        return None
+
+
+class ShardedBggMeta:
+    """bgg-meta/index.json を読み、引かれた id を含む分割ファイルだけを読み込む。"""
+
+    def __init__(self, root: Path) -> None:
+        with (root / "index.json").open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        if not isinstance(payload, dict) or payload.get("version") != META_SHARDS_VERSION:
+            raise ValueError("unknown shard index format")
+        shards = payload.get("shards")
+        if not isinstance(shards, dict):
+            raise ValueError("shard index has no shards")
+        self._root = root
+        self._shard_of = {
+            str(bgg_id): str(name)
+            for name, ids in shards.items()
+            if isinstance(ids, list)
+            for bgg_id in ids
+        }
+        self._loaded: dict[str, dict] = {}
+
+    def get(self, bgg_id: str) -> object:
+        name = self._shard_of.get(bgg_id)
+        if name is None:
+            return None
+        shard = self._loaded.get(name)
+        if shard is None:
+            try:
+                with (self._root / f"{name}.json").open("r", encoding="utf-8") as handle:
+                    payload = json.load(handle)
+            except (OSError, json.JSONDecodeError):
+                payload = {}
+            shard = payload if isinstance(payload, dict) else {}
+            self._loaded[name] = shard
+        return shard.get(bgg_id)
+
+    @property
+    def shards_loaded(self) -> int:
+        return len(self._loaded)
+
+
+def _open_meta_source() -> ShardedBggMeta | BggMetaIndex | dict[str, dict]:
+    """get(bgg_id) でメタ情報を返すオブジェクト。
+
+    分割レイアウトがあればそれを、なければ索引付きの JSON を、どちらも無ければ JSON 全体を読み込む。
+    BggMetaIndex は mmap を持つので、使い終わったら _close_meta_source() で閉じる。
+    """
+    shards_dir = BGG_META_PATH.with_suffix("")
+    if (shards_dir / "index.json").exists():
+        try:
+            return ShardedBggMeta(shards_dir)
+        except (OSError, ValueError):
+            pass
+    index_path = BGG_META_PATH.with_suffix(".idx")
+    if index_path.exists():
+        try:
+            return BggMetaIndex(BGG_META_PATH, index_path)
+        except (OSError, ValueError):
+            pass
+    return _load_bgg_meta()
+
+
+_meta_source: ShardedBggMeta | BggMetaIndex | dict[str, dict] | None = None
+
+
+def _close_meta_source() -> None:
+    global _meta_source
+    if isinstance(_meta_source, BggMetaIndex):
+        _meta_source.close()
+    _meta_source = None
+
+
+class CoverFile(NamedTuple):
+    size: int
+    mtime_ns: int
+
+
+def _scan_covers() -> dict[str, CoverFile]:
+    covers: dict[str, CoverFile] = {}
+    try:
+        with os.scandir(COVERS_DIR) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                covers[entry.name] = CoverFile(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    except OSError:
+        return {}
+    return covers
+
+
 def _format_range(min_value: object, max_value: object, suffix: str = "") -> str | None:
     if not isinstance(min_value, int) or not isinstance(max_value, int):
         return None
@@ -58,146 +261,517 @@ def _attr_int(value: object) -> str:
     return ""
 
 
-def _build_chip_html(fields: dict) -> str:
-    chips: list[str] = []
-    if fields["players_text"]:
-        chips.append(
+class GameFields(NamedTuple):
+    bgg_id: str
+    players_min: object
+    players_max: object
+    players_text: str | None
+    time_min: object
+    time_max: object
+    time_text: str | None
+    year: object
+    min_age: object
+    safe_designers: tuple[str, ...]
+    cover_path: str | None
+    cover_width: int | None
+    cover_height: int | None
+    cover_srcset: str | None
+    cover_avif_srcset: str | None
+    cover_placeholder_style: str | None
+
+
+def _build_placeholder_style(cover: dict) -> str | None:
+    placeholder = cover.get("placeholder")
+    if not isinstance(placeholder, dict):
+        return None
+    color = placeholder.get("color")
+    image = placeholder.get("image")
+    declarations: list[str] = []
+    if isinstance(color, str) and PLACEHOLDER_COLOR.fullmatch(color):
+        declarations.append(f"background-color:{color}")
+    if isinstance(image, str) and PLACEHOLDER_IMAGE.fullmatch(image):
+        declarations.append(f"background-image:url({image})")
+    return ";".join(declarations) or None
+
+
+def _build_srcsets(
+    cover: dict, cover_path: str, cover_width: int, covers: dict[str, CoverFile]
+) -> tuple[str | None, str | None]:
+    """cover.variants から WebP / AVIF の srcset を組み立てる。縮小版がなければ None。"""
+    variants = cover.get("variants")
+    if not isinstance(variants, list):
+        return None, None
+
+    webp: list[tuple[int, str]] = []
+    avif: list[tuple[int, str]] = []
+    for variant in variants:
+        if not isinstance(variant, dict):
+            continue
+        path = variant.get("path")
+        width = variant.get("width")
+        mime = variant.get("type")
+        if (
+            not isinstance(path, str)
+            or not path.startswith(COVER_PATH_PREFIX)
+            or not isinstance(width, int)
+            or width <= 0
+            or path[len(COVER_PATH_PREFIX):] not in covers
+        ):
+            continue
+        if mime == "image/webp":
+            webp.append((width, path))
+        elif mime == "image/avif":
+            avif.append((width, path))
+
+    def _srcset(candidates: list[tuple[int, str]]) -> str:
+        return ", ".join(
+            f"../{html.escape(path, quote=True)} {width}w" for width, path in sorted(candidates)
+        )
+
+    webp_srcset = _srcset([*webp, (cover_width, cover_path)]) if webp else None
+    avif_srcset = _srcset(avif) if avif else None
+    return webp_srcset, avif_srcset
+
+
+def _extract_meta_fields(
+    bgg_id: str, meta: object, covers: dict[str, CoverFile]
+) -> GameFields | None:
+    if not isinstance(meta, dict):
+        return None
+
+    players = meta.get("players")
+    playing_time = meta.get("playing_time")
+    designers = meta.get("designers")
+    cover = meta.get("cover")
+
+    players_min: object = None
+    players_max: object = None
+    players_text: str | None = None
+    if isinstance(players, dict):
+        players_min = players.get("min")
+        players_max = players.get("max")
+        players_text = _format_range(players_min, players_max, "人")
+
+    time_min: object = None
+    time_max: object = None
+    time_text: str | None = None
+    if isinstance(playing_time, dict):
+        time_min = playing_time.get("min")
+        time_max = playing_time.get("max")
+        time_text = _format_range(time_min, time_max, "分")
+
+    safe_designers: tuple[str, ...] = ()
+    if isinstance(designers, list):
+        safe_designers = tuple(
+            html.escape(name)
+            for name in designers
+            if isinstance(name, str) and name.strip()
+        )
+
+    cover_path: str | None = None
+    cover_width: int | None = None
+    cover_height: int | None = None
+    cover_srcset: str | None = None
+    cover_avif_srcset: str | None = None
+    cover_placeholder_style: str | None = None
+    if isinstance(cover, dict):
+        path = cover.get("path")
+        width = cover.get("width")
+        height = cover.get("height")
+        if (
+            isinstance(path, str)
+            and path.startswith(COVER_PATH_PREFIX)
+            and isinstance(width, int)
+            and isinstance(height, int)
+            and width > 0
+            and height > 0
+            and path[len(COVER_PATH_PREFIX):] in covers
+        ):
+            cover_path = path
+            cover_width = width
+            cover_height = height
+            cover_srcset, cover_avif_srcset = _build_srcsets(cover, path, width, covers)
+            cover_placeholder_style = _build_placeholder_style(cover)
+
+    return GameFields(
+        bgg_id=str(bgg_id),
+        players_min=players_min,
+        players_max=players_max,
+        players_text=players_text,
+        time_min=time_min,
+        time_max=time_max,
+        time_text=time_text,
+        year=meta.get("year_published"),
+        min_age=meta.get("min_age"),
+        safe_designers=safe_designers,
+        cover_path=cover_path,
+        cover_width=cover_width,
+        cover_height=cover_height,
+        cover_srcset=cover_srcset,
+        cover_avif_srcset=cover_avif_srcset,
+        cover_placeholder_style=cover_placeholder_style,
+    )
+
+
+class GameFieldTable:
+    """bgg_id ごとの表示用フィールドを、最初に引かれたときに一度だけ組み立てて保持する。"""
+
+    __slots__ = ("_lookup", "_covers", "_records", "lookups", "misses")
+
+    def __init__(self, lookup: Callable[[str], object], covers: dict[str, CoverFile]) -> None:
+        self._lookup = lookup
+        self._covers = covers
+        self._records: dict[str, GameFields | None] = {}
+        self.lookups = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(1 for fields in self._records.values() if fields is not None)
+
+    def get(self, bgg_id: object) -> GameFields | None:
+        self.lookups += 1
+        key = str(bgg_id)
+        try:
+            fields = self._records[key]
+        except KeyError:
+            fields = _extract_meta_fields(key, self._lookup(key), self._covers)
+            self._records[key] = fields
+        if fields is None:
+            self.misses += 1
+        return fields
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "records": len(self),
+            "lookups": self.lookups,
+            "hits": self.lookups - self.misses,
+            "misses": self.misses,
+        }
+
+
+_field_table: GameFieldTable | None = None
+
+
+def field_table_stats() -> dict[str, int]:
+    if _field_table is None:
+        return {"records": 0, "lookups": 0, "hits": 0, "misses": 0}
+    return _field_table.stats()
+
+
+class MacroProfiler:
+    """マクロごとの呼び出し回数・所要時間・出力バイト数を集計する。
+
+    wrap() した関数から別のマクロを呼ぶと、両方に計上される。game_card は部品のマクロを
+    経由せず CardTemplate で組み立てるので、game_cover などには計上されない。
+    """
+
+    def __init__(self, output: Path) -> None:
+        self.output = output
+        self._timings: dict[str, list[float]] = {}
+        self._output_bytes: dict[str, int] = {}
+
+    def wrap(self, fn: Callable[..., object]) -> Callable[..., object]:
+        name = fn.__name__
+        timings = self._timings.setdefault(name, [])
+        self._output_bytes.setdefault(name, 0)
+
+        @wraps(fn)
+        def profiled(*args: object, **kwargs: object) -> object:
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+            if isinstance(result, str):
+                self._output_bytes[name] += len(result.encode("utf-8"))
+            return result
+
+        return profiled
+
+    def report(self) -> dict[str, object]:
+        macros: dict[str, dict[str, float | int]] = {}
+        for name, timings in sorted(self._timings.items()):
+            ordered = sorted(timings)
+            p95 = ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)] if ordered else 0.0
+            macros[name] = {
+                "calls": len(ordered),
+                "total_ms": round(sum(ordered) * 1000, 3),
+                "p95_ms": round(p95 * 1000, 4),
+                "output_bytes": self._output_bytes[name],
+            }
+        return {"macros": macros, "field_table": field_table_stats()}
+
+    def write(self) -> None:
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        with self.output.open("w", encoding="utf-8", newline="\n") as handle:
+            json.dump(self.report(), handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
+
+_profiler: MacroProfiler | None = None
+
+
+def _profile_output(env) -> Path | None:
+    value = os.environ.get(MACRO_PROFILE_ENV)
+    if not value:
+        conf = getattr(env, "conf", None) or {}
+        extra = conf.get("extra") or {}
+        # MkDocs の extra は dict ではなく SubConfig（UserDict）なので Mapping で判定する。
+        value = extra.get("macro_profile") if isinstance(extra, Mapping) else None
+    return Path(value) if isinstance(value, str) and value else None
+
+
+NO_IMAGE_HTML = (
+    '<figure class="game-card__media game-card__media--placeholder">'
+    '<span class="game-card__media-placeholder-text">NO IMAGE</span>'
+    "</figure>"
+)
+
+
+class CardTemplate:
+    """game_card() とその部品のマクロの HTML を一度に組み立てる。
+
+    アイコンを含む固定部分は生成時に連結しておき、描画では可変部分だけを out に積む。
+    呼び出し側は最後に一度だけ "".join(out) する。
+    """
+
+    def __init__(self, field_table: GameFieldTable) -> None:
+        self._field_table = field_table
+        icon = _material_icon
+        self._heading_open = (
+            '<div class="game-card__body">'
+            '<h2 class="game-card__heading">'
+            f'<span class="game-card__title-icon" aria-hidden="true">{icon("material-train")}</span>'
+        )
+        self._year_badge_open = (
+            '<span class="game-card__year-badge">'
+            f'{icon("material-calendar", "game-card__year-icon")}'
+        )
+        self._chip_players = (
             '<span class="game-card__chip">'
-            f'{_material_icon("material-account-group", "game-card__chip-icon")}'
+            f'{icon("material-account-group", "game-card__chip-icon")}'
             '<span class="game-card__chip-label">人数</span>'
-            f'{fields["players_text"]}'
-            "</span>"
         )
-    if fields["time_text"]:
-        chips.append(
+        self._chip_time = (
             '<span class="game-card__chip">'
-            f'{_material_icon("material-timer-outline", "game-card__chip-icon")}'
+            f'{icon("material-timer-outline", "game-card__chip-icon")}'
             '<span class="game-card__chip-label">時間</span>'
-            f'{fields["time_text"]}'
-            "</span>"
         )
-    return "".join(chips)
-
-
-def _build_detail_rows_html(fields: dict) -> str:
-    rows: list[str] = []
-
-    if isinstance(fields["year"], int):
-        rows.append(
+        self._cta_close = (
+            '">'
+            f'{icon("material-file-document-outline", "game-card__cta-icon")}'
+            '<span class="game-card__cta-label">サマリーを見る</span>'
+            "</a>"
+        )
+        self._details_open = (
+            '<details class="game-card__details">'
+            '<summary class="game-card__details-summary">'
+            '<span class="game-card__details-summary-label">詳細情報</span>'
+            "</summary>"
+            '<ul class="game-card__details-body">'
+        )
+        self._row_year = (
             '<li class="game-card__detail-row">'
-            f'{_material_icon("material-calendar", "game-card__detail-icon")}'
+            f'{icon("material-calendar", "game-card__detail-icon")}'
             '<span class="game-card__detail-label">発売年</span>'
-            f'<span>{fields["year"]}</span>'
-            "</li>"
+            "<span>"
         )
-
-    if isinstance(fields["min_age"], int) and fields["min_age"] > 0:
-        rows.append(
+        self._row_age = (
             '<li class="game-card__detail-row">'
-            f'{_material_icon("material-badge-account", "game-card__detail-icon")}'
+            f'{icon("material-badge-account", "game-card__detail-icon")}'
             '<span class="game-card__detail-label">対象年齢</span>'
-            f'<span>{fields["min_age"]}+</span>'
-            "</li>"
+            "<span>"
         )
-
-    if fields["safe_designers"]:
-        rows.append(
+        self._row_designers = (
             '<li class="game-card__detail-row">'
-            f'{_material_icon("material-draw", "game-card__detail-icon")}'
+            f'{icon("material-draw", "game-card__detail-icon")}'
             '<span class="game-card__detail-label">デザイナー</span>'
-            f'<span>{", ".join(fields["safe_designers"])}</span>'
-            "</li>"
+            "<span>"
         )
 
-    return "".join(rows)
-
-
-def define_env(env) -> None:
-    bgg_meta = _load_bgg_meta()
-
-    def _extract_meta_fields(bgg_id: str) -> dict | None:
-        meta = bgg_meta.get(str(bgg_id))
-        if not isinstance(meta, dict):
-            return None
+    def render_card(
+        self, bgg_id: str, title: str, description: str, bgg_href: str, summary_href: str
+    ) -> str:
+        key = str(bgg_id)
+        fields = self._field_table.get(key)
+        # game_cover() は前後の空白を除いた id で引く。
+        cover_key = key.strip()
+        cover_fields = fields if cover_key == key else self._field_table.get(cover_key)
+        safe_title = html.escape(title) if title else ""
+        safe_href = html.escape(summary_href, quote=True) if summary_href else ""
 
-        players = meta.get("players")
-        playing_time = meta.get("playing_time")
-        year = meta.get("year_published")
-        designers = meta.get("designers")
-        min_age = meta.get("min_age")
-        cover = meta.get("cover")
-
-        players_min: object = None
-        players_max: object = None
-        players_text: str | None = None
-        if isinstance(players, dict):
-            players_min = players.get("min")
-            players_max = players.get("max")
-            players_text = _format_range(players_min, players_max, "人")
-
-        time_min: object = None
-        time_max: object = None
-        time_text: str | None = None
-        if isinstance(playing_time, dict):
-            time_min = playing_time.get("min")
-            time_max = playing_time.get("max")
-            time_text = _format_range(time_min, time_max, "分")
-
-        safe_designers: list[str] = []
-        if isinstance(designers, list):
-            safe_designers = [
-                html.escape(name)
-                for name in designers
-                if isinstance(name, str) and name.strip()
-            ]
-
-        cover_path: str | None = None
-        cover_width: int | None = None
-        cover_height: int | None = None
-        if isinstance(cover, dict):
-            path = cover.get("path")
-            width = cover.get("width")
-            height = cover.get("height")
-            if (
-                isinstance(path, str)
-                and path.startswith("assets/game-covers/")
-                and isinstance(width, int)
-                and isinstance(height, int)
-                and width > 0
-                and height > 0
-                and (Path("docs") / path).exists()
-            ):
-                cover_path = path
-                cover_width = width
-                cover_height = height
+        out: list[str] = []
+        if fields is None:
+            out.append('<article class="game-card" data-year="" data-players-min="" data-players-max="">')
+        else:
+            out += (
+                '<article class="game-card" data-year="',
+                _attr_int(fields.year),
+                '" data-players-min="',
+                _attr_int(fields.players_min),
+                '" data-players-max="',
+                _attr_int(fields.players_max),
+                '">',
+            )
+        self.render_cover(out, cover_fields if cover_key else None, safe_title, safe_href)
+        out.append(self._heading_open)
+        self.render_title(out, safe_title, fields)
+        out += ('</h2><p class="game-card__description">', html.escape(description) if description else "")
+        if bgg_href:
+            out += (' (<a href="', html.escape(bgg_href, quote=True), '">BGG</a>)')
+        out.append("</p>")
+        self.render_actions(out, fields, safe_href)
+        out.append("</div></article>")
+        return "".join(out)
+
+    def render_cover(
+        self, out: list[str], fields: GameFields | None, safe_title: str, safe_href: str
+    ) -> None:
+        if fields is None:
+            out.append(NO_IMAGE_HTML)
+            return
+        cover_path = fields.cover_path
+        cover_width = fields.cover_width
+        cover_height = fields.cover_height
+        if (
+            not isinstance(cover_path, str)
+            or not isinstance(cover_width, int)
+            or not isinstance(cover_height, int)
+        ):
+            out.append(NO_IMAGE_HTML)
+            return
+
+        if fields.cover_placeholder_style:
+            # 画像が届くまで、埋め込みのプレビュー（平均色）を背景に敷いておく。
+            out += (
+                '<figure class="game-card__media game-card__media--lqip" style="',
+                fields.cover_placeholder_style,
+                '">',
+            )
+        else:
+            out.append('<figure class="game-card__media">')
+        if safe_href:
+            out += (
+                '<a class="game-card__media-link" href="',
+                safe_href,
+                '" aria-label="',
+                f"{safe_title} サマリーを見る" if safe_title else "サマリーを見る",
+                '">',
+            )
+        avif_srcset = fields.cover_avif_srcset
+        if avif_srcset:
+            out += (
+                '<picture class="game-card__media-picture"><source type="image/avif" srcset="',
+                avif_srcset,
+                f'" sizes="{COVER_SIZES}">',
+            )
+        out += ('<img src="../', html.escape(cover_path, quote=True), '" ')
+        if fields.cover_srcset:
+            out += ('srcset="', fields.cover_srcset, f'" sizes="{COVER_SIZES}" ')
+        out += (
+            'alt="',
+            safe_title or "Game",
+            ' パッケージ画像" width="',
+            str(cover_width),
+            '" height="',
+            str(cover_height),
+            '" loading="lazy" decoding="async">',
+        )
+        if avif_srcset:
+            out.append("</picture>")
+        if safe_href:
+            out.append("</a>")
+        out.append("</figure>")
+
+    def render_title(self, out: list[str], safe_title: str, fields: GameFields | None) -> None:
+        out += ('<span class="game-card__title-text">', safe_title, "</span>")
+        if fields is not None and isinstance(fields.year, int):
+            out += (self._year_badge_open, str(fields.year), "</span>")
+
+    def render_actions(self, out: list[str], fields: GameFields | None, safe_href: str) -> None:
+        has_chips = has_details = False
+        if fields is not None:
+            has_chips = bool(fields.players_text or fields.time_text)
+            has_details = bool(
+                isinstance(fields.year, int)
+                or (isinstance(fields.min_age, int) and fields.min_age > 0)
+                or fields.safe_designers
+            )
+        if not (has_chips or has_details or safe_href):
+            return
+
+        out.append('<div class="game-card__actions">')
+        if has_chips or safe_href:
+            out.append('<div class="game-card__actions-top">')
+            if has_chips:
+                out += (
+                    '<div class="game-card__chips" data-bgg-id="',
+                    html.escape(fields.bgg_id, quote=True),
+                    '" data-players-min="',
+                    _attr_int(fields.players_min),
+                    '" data-players-max="',
+                    _attr_int(fields.players_max),
+                    '" data-time-min="',
+                    _attr_int(fields.time_min),
+                    '" data-time-max="',
+                    _attr_int(fields.time_max),
+                    '" data-year="',
+                    _attr_int(fields.year),
+                    '" data-min-age="',
+                    _attr_int(fields.min_age),
+                    '">',
+                )
+                if fields.players_text:
+                    out += (self._chip_players, fields.players_text, "</span>")
+                if fields.time_text:
+                    out += (self._chip_time, fields.time_text, "</span>")
+                out.append("</div>")
+            if safe_href:
+                out += ('<a class="btn btn--primary game-card__cta" href="', safe_href, self._cta_close)
+            out.append("</div>")
+        if has_details:
+            out.append(self._details_open)
+            if isinstance(fields.year, int):
+                out += (self._row_year, str(fields.year), "</span></li>")
+            if isinstance(fields.min_age, int) and fields.min_age > 0:
+                out += (self._row_age, str(fields.min_age), "+</span></li>")
+            if fields.safe_designers:
+                out += (self._row_designers, ", ".join(fields.safe_designers), "</span></li>")
+            out.append("</ul></details>")
+        out.append("</div>")
+
+
+def _prewarm_icons() -> None:
+    for shortname, css_class in PREWARM_ICONS:
+        _material_icon(shortname, css_class)
 
-        return {
-            "bgg_id": str(bgg_id),
-            "players_min": players_min,
-            "players_max": players_max,
-            "players_text": players_text,
-            "time_min": time_min,
-            "time_max": time_max,
-            "time_text": time_text,
-            "year": year,
-            "min_age": min_age,
-            "safe_designers": safe_designers,
-            "cover_path": cover_path,
-            "cover_width": cover_width,
-            "cover_height": cover_height,
-        }
 
-    @env.macro
+def define_env(env) -> None:
+    global _field_table, _meta_source, _profiler
+    _prewarm_icons()
+    # mkdocs serve は再ビルドのたびに define_env を呼ぶ。前回のビルドが途中で失敗していても mmap を残さない。
+    _close_meta_source()
+    meta_source = _open_meta_source()
+    _meta_source = meta_source
+    field_table = GameFieldTable(meta_source.get, _scan_covers())
+    _field_table = field_table
+    card_template = CardTemplate(field_table)
+    profile_output = _profile_output(env)
+    profiler = MacroProfiler(profile_output) if profile_output is not None else None
+    _profiler = profiler
+
+    def macro(fn):
+        return env.macro(profiler.wrap(fn) if profiler is not None else fn)
+
+    @macro
     def print_button() -> str:
         return '<button class="btn btn--outline btn--sm" onclick="window.print()">印刷</button>'
 
-    @env.macro
+    @macro
     def icon(name: str) -> str:
         if not isinstance(name, str) or not name.strip():
             return ""
         return _material_icon(name.strip())
 
-    @env.macro
+    @macro
     def download_link(filename: str) -> str:
         if not filename:
             return ""
@@ -205,129 +779,36 @@ def define_env(env) -> None:
         href = f"../../assets/{safe_name}"
         return f'<a class="btn btn--outline btn--sm" href="{href}" download>テキストDL</a>'
 
-    @env.macro
+    @macro
     def game_title(title: str, bgg_id: str) -> str:
-        safe_title = html.escape(title) if title else ""
-        year_badge = ""
-        fields = _extract_meta_fields(bgg_id)
-        if isinstance(fields, dict) and isinstance(fields.get("year"), int):
-            year_badge = (
-                '<span class="game-card__year-badge">'
-                f'{_material_icon("material-calendar", "game-card__year-icon")}'
-                f'{fields["year"]}'
-                "</span>"
-            )
-        return (
-            f'<span class="game-card__title-text">{safe_title}</span>'
-            f"{year_badge}"
-        )
+        out: list[str] = []
+        card_template.render_title(out, html.escape(title) if title else "", field_table.get(bgg_id))
+        return "".join(out)
 
-    @env.macro
+    @macro
     def game_cover(bgg_id: str, title: str, href: str = "") -> str:
         safe_bgg_id = str(bgg_id).strip()
-        safe_title = html.escape(title) if title else "Game"
-        fields = _extract_meta_fields(safe_bgg_id)
-
-        if not safe_bgg_id:
-            return (
-                '<figure class="game-card__media game-card__media--placeholder">'
-                '<span class="game-card__media-placeholder-text">NO IMAGE</span>'
-                "</figure>"
-            )
-
-        if not isinstance(fields, dict):
-            return (
-                '<figure class="game-card__media game-card__media--placeholder">'
-                '<span class="game-card__media-placeholder-text">NO IMAGE</span>'
-                "</figure>"
-            )
-
-        cover_path = fields.get("cover_path")
-        cover_width = fields.get("cover_width")
-        cover_height = fields.get("cover_height")
-        if (
-            not isinstance(cover_path, str)
-            or not isinstance(cover_width, int)
-            or not isinstance(cover_height, int)
-        ):
-            return (
-                '<figure class="game-card__media game-card__media--placeholder">'
-                '<span class="game-card__media-placeholder-text">NO IMAGE</span>'
-                "</figure>"
-            )
-
-        image_src = f"../{html.escape(cover_path, quote=True)}"
-        image_html = (
-            f'<img src="{image_src}" '
-            f'alt="{safe_title} パッケージ画像" '
-            f'width="{cover_width}" '
-            f'height="{cover_height}" '
-            'loading="lazy" '
-            'decoding="async">'
+        fields = field_table.get(safe_bgg_id)
+        out: list[str] = []
+        card_template.render_cover(
+            out,
+            fields if safe_bgg_id else None,
+            html.escape(title) if title else "",
+            html.escape(href, quote=True) if href else "",
         )
+        return "".join(out)
 
-        if href:
-            safe_href = html.escape(href, quote=True)
-            aria_label = html.escape(f"{title} サマリーを見る", quote=True) if title else "サマリーを見る"
-            image_html = (
-                f'<a class="game-card__media-link" href="{safe_href}" '
-                f'aria-label="{aria_label}">{image_html}</a>'
-            )
-
-        return f'<figure class="game-card__media">{image_html}</figure>'
-
-    @env.macro
+    @macro
     def game_actions(bgg_id: str, summary_href: str) -> str:
-        fields = _extract_meta_fields(bgg_id)
-        safe_href = html.escape(summary_href, quote=True) if summary_href else ""
-
-        chips_block = ""
-        details_block = ""
-        if isinstance(fields, dict):
-            chips_html = _build_chip_html(fields)
-            if chips_html:
-                chips_attrs = (
-                    f'data-bgg-id="{html.escape(fields["bgg_id"], quote=True)}" '
-                    f'data-players-min="{_attr_int(fields["players_min"])}" '
-                    f'data-players-max="{_attr_int(fields["players_max"])}" '
-                    f'data-time-min="{_attr_int(fields["time_min"])}" '
-                    f'data-time-max="{_attr_int(fields["time_max"])}" '
-                    f'data-year="{_attr_int(fields["year"])}" '
-                    f'data-min-age="{_attr_int(fields["min_age"])}"'
-                )
-                chips_block = f'<div class="game-card__chips" {chips_attrs}>{chips_html}</div>'
-
-            detail_rows = _build_detail_rows_html(fields)
-            if detail_rows:
-                details_block = (
-                    '<details class="game-card__details">'
-                    '<summary class="game-card__details-summary">'
-                    '<span class="game-card__details-summary-label">詳細情報</span>'
-                    "</summary>"
-                    f'<ul class="game-card__details-body">{detail_rows}</ul>'
-                    "</details>"
-                )
-
-        cta_block = ""
-        if safe_href:
-            cta_block = (
-                f'<a class="btn btn--primary game-card__cta" href="{safe_href}">'
-                f'{_material_icon("material-file-document-outline", "game-card__cta-icon")}'
-                '<span class="game-card__cta-label">サマリーを見る</span>'
-                "</a>"
-            )
-
-        top_parts = "".join(part for part in (chips_block, cta_block) if part)
-        top_block = ""
-        if top_parts:
-            top_block = f'<div class="game-card__actions-top">{top_parts}</div>'
-
-        if not top_block and not details_block:
-            return ""
-
-        return f'<div class="game-card__actions">{top_block}{details_block}</div>'
+        out: list[str] = []
+        card_template.render_actions(
+            out,
+            field_table.get(bgg_id),
+            html.escape(summary_href, quote=True) if summary_href else "",
+        )
+        return "".join(out)
 
-    @env.macro
+    @macro
     def game_card(
         bgg_id: str,
         title: str,
@@ -335,32 +816,14 @@ def define_env(env) -> None:
         bgg_href: str,
         summary_href: str,
     ) -> str:
-        safe_description = html.escape(description) if description else ""
-        safe_bgg_href = html.escape(bgg_href, quote=True) if bgg_href else ""
-        fields = _extract_meta_fields(bgg_id)
-
-        data_attrs = ' data-year="" data-players-min="" data-players-max=""'
-        if isinstance(fields, dict):
-            data_attrs = (
-                f' data-year="{_attr_int(fields["year"])}"'
-                f' data-players-min="{_attr_int(fields["players_min"])}"'
-                f' data-players-max="{_attr_int(fields["players_max"])}"'
-            )
+        # 部品のマクロは呼ばずに一度で組み立てる（フィールド表もカード1枚につき1回だけ引く）。
+        return card_template.render_card(bgg_id, title, description, bgg_href, summary_href)
 
-        bgg_link = ""
-        if safe_bgg_href:
-            bgg_link = f' (<a href="{safe_bgg_href}">BGG</a>)'
 
-        return (
-            f'<article class="game-card"{data_attrs}>'
-            f'{game_cover(bgg_id, title, summary_href)}'
-            '<div class="game-card__body">'
-            '<h2 class="game-card__heading">'
-            f'<span class="game-card__title-icon" aria-hidden="true">{icon("material-train")}</span>'
-            f"{game_title(title, bgg_id)}"
-            "</h2>"
-            f'<p class="game-card__description">{safe_description}{bgg_link}</p>'
-            f"{game_actions(bgg_id, summary_href)}"
-            "</div>"
-            "</article>"
-        )
+def on_post_build(env) -> None:
+    # ビルド後も mmap を開いたままにすると、bgg_fetch.py の書き換え（Windows）を妨げる。
+    _close_meta_source()
+    if _profiler is None:
+        return
+    _profiler.write()
+    log.info("Wrote macro profile to %s", _profiler.output)
@@ -1,39 +1,109 @@
 from __future__ import annotations
 
+import argparse
+import base64
+import hashlib
+import http.client
 import io
 import json
+import multiprocessing
 import os
+import random
 import re
+import shutil
+import struct
+import tempfile
+import threading
 import time
-import urllib.error
 import urllib.parse
 import urllib.request
 import xml.etree.ElementTree as ET
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
 from pathlib import Path
-from typing import Iterable
+from typing import IO, Iterable, Iterator
 
 try:
-    from PIL import Image, UnidentifiedImageError
+    from PIL import Image, UnidentifiedImageError, features
 except ImportError:  # pragma: no cover - handled at runtime
     Image = None  # type: ignore[assignment]
+    features = None  # type: ignore[assignment]
     UnidentifiedImageError = Exception  # type: ignore[assignment]
 
 GAMES_DIR = Path("docs/games")
 ASSETS_DIR = Path("docs/assets")
 OUTPUT_JSON = ASSETS_DIR / "bgg-meta.json"
+# --write-index で書く bgg-meta.json の索引。main.py はこれで参照された id だけを読む。
+OUTPUT_INDEX = OUTPUT_JSON.with_suffix(".idx")
+# 形式: ヘッダ（マジック, JSON のバイト数, 件数）+ id 昇順のレコード（id, 値の開始位置, 値の長さ）。
+# main.py の BggMetaIndex と揃えること。
+META_INDEX_MAGIC = b"BGGMIDX1"
+META_INDEX_HEADER = struct.Struct("<8sQI")
+META_INDEX_RECORD = struct.Struct("<QQI")
+# --layout sharded の保存先。id を crc32 で振り分けた分割ファイルと index.json を置く。
+OUTPUT_SHARDS_DIR = ASSETS_DIR / "bgg-meta"
+# 取得した id は fetched_at が変わり、その分割ファイルは書き直される。--layout sharded では
+# 全件取得せず、既定でこの日数より古い id だけを取り直す（--stale-after 0 で全件）。
+SHARDED_STALE_AFTER_DAYS = 7.0
+META_SHARD_COUNT = 32
+META_SHARDS_VERSION = 1
 COVERS_DIR = ASSETS_DIR / "game-covers"
+# 変換したカバーはいったん COVERS_DIR/.staging に書き、取得が最後まで終わってから移す。
+# 途中で中断したら捨て、書き換えなかった bgg-meta.json と食い違わないようにする。
+COVER_STAGING_DIR_NAME = ".staging"
 
 API_URL = "https://boardgamegeek.com/xmlapi2/thing"
 REQUEST_TYPES = "boardgame"
+# BGG API の1リクエストあたりの上限。チャンクサイズはここから応答に応じて増減する。
 CHUNK_SIZE = 20
+CHUNK_MIN_SIZE = 1
+# 1リクエストの応答がこれより遅ければチャンクを小さくする。
+CHUNK_TARGET_SECONDS = 10.0
 REQUEST_SLEEP_SECONDS = 5
+DEFAULT_CONCURRENCY = 4
 RETRY_MAX = 4
 RETRY_BACKOFF_SECONDS = 5
+RETRY_BACKOFF_MAX_SECONDS = 120
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# トークンの不備。id に関係なくすべてのリクエストが失敗するので、実行ごと中止する。
+AUTH_FAILURE_STATUSES = frozenset({401, 403})
+# 特定の id が原因になりうる応答。チャンクを分割して原因の id を切り分ける。
+ID_SPECIFIC_STATUSES = frozenset({400})
 IMAGE_TIMEOUT_SECONDS = 30
+API_TIMEOUT_SECONDS = 30
+USER_AGENT = "18xx-summary-site/1.0 (+https://boardgamegeek.com)"
+# ホストごとに残しておく keep-alive 接続の上限。並行数より小さいと接続を張り直すことになる。
+POOL_MAX_IDLE_PER_HOST = 8
+MAX_REDIRECTS = 5
+# --cache / --offline で使う生レスポンスのキャッシュ。
+RESPONSE_CACHE_DIR = Path(".cache/bgg")
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
 COVER_MAX_WIDTH = 480
 COVER_MAX_HEIGHT = 640
 COVER_WEBP_QUALITY = 85
+COVER_WEBP_METHOD = 6
+# 一覧カード用の縮小版の幅。COVER_MAX_WIDTH の本体と合わせて srcset になる。
+COVER_VARIANT_WIDTHS = (160, 320)
+COVER_AVIF_QUALITY = 60
+# bgg-meta.json に埋め込むプレースホルダー（画像読み込み前に表示する極小プレビュー）。
+COVER_PLACEHOLDER_WIDTH = 8
+COVER_PLACEHOLDER_QUALITY = 40
+DEFAULT_DOWNLOAD_WORKERS = 4
+# cover に記録する取得元の検証情報。再取得の要否判定に使う。
+COVER_VALIDATOR_KEYS = ("source_url", "etag", "last_modified", "sha256")
+DEFAULT_ENCODE_WORKERS = os.cpu_count() or 1
 
 FRONTMATTER_START = re.compile(r"^---\s*$")
 FRONTMATTER_KV = re.compile(r"^bgg_id\s*:\s*['\"]?(\d+)['\"]?\s*$")
@@ -94,6 +164,50 @@ def collect_bgg_ids(games_dir: Path) -> list[str]:
     return sorted(set(ids))
 
 
+def _format_timestamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_timestamp(value: object) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc)
+
+
+def select_ids_to_fetch(
+    ids: list[str],
+    previous: dict[str, dict],
+    now: datetime,
+    stale_after: timedelta | None = None,
+    only_new: bool = False,
+) -> list[str]:
+    """取得対象の id を返す。未取得の id は常に対象、既存の id は条件次第。
+
+    only_new: 既存 id は取得しない。
+    stale_after: fetched_at がそれより古い（または記録がない）既存 id だけを取得する。
+    どちらも指定しなければ全件を取得する。
+    """
+    if not only_new and stale_after is None:
+        return list(ids)
+
+    targets: list[str] = []
+    for bgg_id in ids:
+        entry = previous.get(bgg_id)
+        if not isinstance(entry, dict):
+            targets.append(bgg_id)
+            continue
+        if only_new:
+            continue
+        fetched_at = _parse_timestamp(entry.get("fetched_at"))
+        if fetched_at is None or now - fetched_at >= stale_after:
+            targets.append(bgg_id)
+    return targets
+
+
 def chunked(items: Iterable[str], size: int) -> list[list[str]]:
     chunk: list[str] = []
     chunks: list[list[str]] = []
@@ -107,6 +221,304 @@ def chunked(items: Iterable[str], size: int) -> list[list[str]]:
     return chunks
 
 
+class TokenBucket:
+    """スレッド間で共有するトークンバケット。acquire() ごとにトークンを1つ消費する。
+
+    トークンが足りないときは残高を負にして予約し、補充されるまで待つ。
+    rate は1秒あたりの補充数、capacity は連続して使える上限（バースト）。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HttpError(OSError):
+    """2xx 以外の応答（リダイレクトは追いかけた後）。"""
+
+    def __init__(self, url: str, code: int, reason: str, headers: http.client.HTTPMessage) -> None:
+        super().__init__(f"HTTP {code} {reason} for {url}")
+        self.url = url
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+
+
+class ConnectionPool:
+    """ホストごとに keep-alive 接続を使い回す小さな HTTP クライアント。スレッド間で共有する。
+
+    接続は open() の間だけ1スレッドが占有し、応答を読み切っていれば空き接続に戻す。
+    connections_opened と requests_sent を比べれば、どれだけ接続を使い回せたか分かる。
+    """
+
+    def __init__(self, max_idle_per_host: int = POOL_MAX_IDLE_PER_HOST) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(
+        self, url: str, headers: dict[str, str] | None = None, timeout: float = API_TIMEOUT_SECONDS
+    ) -> Iterator[http.client.HTTPResponse]:
+        """GET して応答を返す。リダイレクトは追いかけ、2xx 以外は HttpError。"""
+        for _ in range(MAX_REDIRECTS + 1):
+            key, connection, response = self._send(url, headers or {}, timeout)
+            location = response.getheader("Location")
+            if response.status in REDIRECT_STATUSES and location:
+                self._release(key, connection, response, drain=True)
+                url = urllib.parse.urljoin(url, location)
+                continue
+            if not 200 <= response.status < 300:
+                error = HttpError(url, response.status, response.reason, response.headers)
+                self._release(key, connection, response, drain=True)
+                raise error
+            break
+        else:
+            raise HttpError(url, response.status, "Too many redirects", response.headers)
+
+        try:
+            yield response
+        except BaseException:
+            connection.close()
+            raise
+        self._release(key, connection, response)
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [connection for connections in self._idle.values() for connection in connections]
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
+
+    def report(self) -> str:
+        return f"HTTP: {self.requests_sent} request(s) over {self.connections_opened} connection(s)"
+
+    def _send(
+        self, url: str, headers: dict[str, str], timeout: float
+    ) -> tuple[tuple[str, str, int], http.client.HTTPConnection, http.client.HTTPResponse]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"} or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        while True:
+            connection, reused = self._checkout(key, timeout)
+            try:
+                connection.request("GET", target, headers=headers)
+                with self._lock:
+                    self.requests_sent += 1
+                return key, connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                # 空き接続がサーバー側で閉じられていた。GET なので新しい接続で送り直してよい。
+                if not reused:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+    def _checkout(
+        self, key: tuple[str, str, int], timeout: float
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                connection = idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+            self.connections_opened += 1
+        scheme, host, port = key
+        factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return factory(host, port, timeout=timeout), False
+
+    def _release(
+        self,
+        key: tuple[str, str, int],
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        drain: bool = False,
+    ) -> None:
+        try:
+            if drain:
+                response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            return
+        if not response.isclosed() or response.will_close:
+            # 読み残しがある、またはサーバーが接続を閉じる応答なので使い回せない。
+            connection.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+
+_http_pool = ConnectionPool()
+
+
+class _BlobWriter:
+    """一時ファイルに書きながらハッシュを取り、commit() で内容アドレスのパスへ移す。"""
+
+    def __init__(self, cache: ResponseCache) -> None:
+        self._cache = cache
+        self._digest = hashlib.sha256()
+        cache.root.mkdir(parents=True, exist_ok=True)
+        self._handle = tempfile.NamedTemporaryFile(dir=cache.root, prefix="blob-", delete=False)
+        self._committed = False
+
+    def write(self, data: bytes) -> None:
+        self._digest.update(data)
+        self._handle.write(data)
+
+    def commit(self) -> str:
+        self._handle.close()
+        digest = self._digest.hexdigest()
+        path = self._cache.blob_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._handle.name, path)
+        self._committed = True
+        return digest
+
+    def discard(self) -> None:
+        if self._committed:
+            return
+        self._handle.close()
+        Path(self._handle.name).unlink(missing_ok=True)
+
+
+class _TeeReader:
+    """読んだバイト列を sink にも書く。パースしながら生レスポンスを保存するのに使う。"""
+
+    def __init__(self, stream: IO[bytes], sink: _BlobWriter) -> None:
+        self._stream = stream
+        self._sink = sink
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._sink.write(data)
+        return data
+
+
+class ResponseCache:
+    """API の XML と画像の生レスポンスを内容アドレス（sha256）で保存するキャッシュ。
+
+    blobs/<先頭2文字>/<sha256> に本体を置き、index.json に bgg_id → XML、URL → 画像 の対応を持つ。
+    offline なら API・画像とも通信せず、ここに記録済みの内容だけを返す。
+    """
+
+    def __init__(self, root: Path = RESPONSE_CACHE_DIR, offline: bool = False) -> None:
+        self.root = root
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._things: dict[str, dict[str, str]] = {}
+        self._images: dict[str, dict[str, str | None]] = {}
+        try:
+            payload = json.loads((root / "index.json").read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            payload = {}
+        if isinstance(payload, dict):
+            if isinstance(payload.get("things"), dict):
+                self._things = payload["things"]
+            if isinstance(payload.get("images"), dict):
+                self._images = payload["images"]
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def new_blob(self) -> _BlobWriter:
+        return _BlobWriter(self)
+
+    def store_meta(self, ids: Iterable[str], digest: str, fetched_at: str) -> None:
+        with self._lock:
+            for bgg_id in ids:
+                self._things[bgg_id] = {"sha256": digest, "fetched_at": fetched_at}
+
+    def fetched_at(self, bgg_id: str) -> str | None:
+        with self._lock:
+            entry = self._things.get(bgg_id)
+        return entry.get("fetched_at") if entry else None
+
+    def load_meta(self, ids: list[str]) -> dict[str, GameMeta]:
+        """記録済みの id だけを返す。同じレスポンスに入っている id はまとめて1回でパースする。"""
+        by_blob: dict[str, set[str]] = {}
+        with self._lock:
+            for bgg_id in ids:
+                entry = self._things.get(bgg_id)
+                if entry:
+                    by_blob.setdefault(entry["sha256"], set()).add(bgg_id)
+        result: dict[str, GameMeta] = {}
+        for digest, wanted in by_blob.items():
+            try:
+                with self.blob_path(digest).open("rb") as handle:
+                    for bgg_id, meta in iter_game_meta(handle):
+                        if bgg_id in wanted:
+                            result[bgg_id] = meta
+            except (OSError, ET.ParseError) as exc:
+                print(f"Cached response {digest} is unreadable: {exc}")
+        return result
+
+    def store_image(self, url: str, response: ImageResponse) -> None:
+        writer = self.new_blob()
+        try:
+            writer.write(response.body)
+            digest = writer.commit()
+        finally:
+            writer.discard()
+        with self._lock:
+            self._images[url] = {
+                "sha256": digest,
+                "etag": response.etag,
+                "last_modified": response.last_modified,
+            }
+
+    def load_image(self, url: str) -> ImageResponse:
+        with self._lock:
+            entry = self._images.get(url)
+        if not entry:
+            raise FileNotFoundError(f"{url} is not in the response cache.")
+        return ImageResponse(
+            body=self.blob_path(str(entry["sha256"])).read_bytes(),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {"things": dict(self._things), "images": dict(self._images)}
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_json(self.root / "index.json", payload)
+
+    def report(self) -> str:
+        with self._lock:
+            return f"Response cache: {len(self._things)} id(s), {len(self._images)} image(s) in {self.root}"
+
+
 def build_request(ids: list[str]) -> urllib.request.Request:
     params = {
         "id": ",".join(ids),
@@ -114,37 +526,234 @@ def build_request(ids: list[str]) -> urllib.request.Request:
         "type": REQUEST_TYPES,
     }
     url = f"{API_URL}?{urllib.parse.urlencode(params)}"
-    headers = {"Accept": "application/xml"}
+    headers = {"Accept": "application/xml", "User-Agent": USER_AGENT}
     token = os.getenv("BGG_TOKEN")
     if token:
         headers["Authorization"] = f"Bearer {token}"
     return urllib.request.Request(url, headers=headers)
 
 
-def fetch_xml(ids: list[str]) -> str:
+class FetchError(RuntimeError):
+    """API 取得の失敗。retryable でなければ再試行しても結果は変わらない。
+
+    id_specific はチャンク内の特定の id が原因になりうる失敗（400 や不正な XML）を表す。
+    """
+
+    def __init__(
+        self,
+        message: str,
+        retryable: bool = True,
+        retry_after: float | None = None,
+        id_specific: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.id_specific = id_specific
+
+
+class AuthenticationError(FetchError):
+    """BGG_TOKEN が無い・拒否された（401 / 403）。どの id でも同じ結果になる。"""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, retryable=False)
+
+
+class QueuedResponseError(FetchError):
+    """BGG がリクエストをキューに積んだ（202 / <message> 応答）。時間をおけば取得できる。"""
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    """Retry-After ヘッダ（秒数または HTTP-date）を待ち秒数にする。"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), RETRY_BACKOFF_MAX_SECONDS)
+
+
+def _backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """ジッター付き指数バックオフ。Retry-After があればそれより短くはしない。"""
+    ceiling = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class ChunkSizer:
+    """観測した応答からチャンクサイズを AIMD で調整する。スレッド間で共有する。
+
+    目標時間内に返った応答ごとに1件ずつ増やし、遅い応答・キュー待ち・過負荷の応答で半分にする。
+    """
+
+    def __init__(
+        self,
+        initial: int = CHUNK_SIZE,
+        minimum: int = CHUNK_MIN_SIZE,
+        maximum: int = CHUNK_SIZE,
+        target_seconds: float = CHUNK_TARGET_SECONDS,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self._size = max(minimum, min(maximum, initial))
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._size
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            if elapsed > self.target_seconds:
+                self._size = max(self.minimum, self._size // 2)
+            else:
+                self._size = min(self.maximum, self._size + 1)
+
+    def record_throttled(self) -> None:
+        with self._lock:
+            self._size = max(self.minimum, self._size // 2)
+
+
+def _request_meta(
+    request: urllib.request.Request, cache: ResponseCache | None = None
+) -> dict[str, GameMeta]:
+    """1回分のリクエスト。失敗はすべて FetchError にして返す。"""
+    writer = cache.new_blob() if cache is not None else None
+    try:
+        with _http_pool.open(
+            request.full_url, dict(request.header_items()), timeout=API_TIMEOUT_SECONDS
+        ) as response:
+            if response.status == 202:
+                raise QueuedResponseError(
+                    "BGG queued the request (HTTP 202).",
+                    retry_after=_retry_after_seconds(response.headers.get("Retry-After")),
+                )
+            # デコード済み文字列を作らず、レスポンスのストリームを直接パースする。
+            # キャッシュするときも、読んだそばから書き出すだけで全体を溜めない。
+            stream = _TeeReader(response, writer) if writer is not None else response
+            result = dict(iter_game_meta(stream))
+        if cache is not None and writer is not None:
+            cache.store_meta(result, writer.commit(), _format_timestamp(datetime.now(timezone.utc)))
+        return result
+    except HttpError as exc:
+        if exc.code in AUTH_FAILURE_STATUSES:
+            raise AuthenticationError(f"HTTP {exc.code}: check BGG_TOKEN") from exc
+        retry_after = _retry_after_seconds(exc.headers.get("Retry-After"))
+        raise FetchError(
+            f"HTTP {exc.code}",
+            retryable=exc.code in RETRYABLE_STATUSES,
+            retry_after=retry_after,
+            id_specific=exc.code in ID_SPECIFIC_STATUSES,
+        ) from exc
+    except ET.ParseError as exc:
+        raise FetchError(f"Malformed XML: {exc}", retryable=False, id_specific=True) from exc
+    except (OSError, http.client.HTTPException) as exc:
+        raise FetchError(str(exc) or type(exc).__name__) from exc
+    finally:
+        if writer is not None:
+            writer.discard()
+
+
+def fetch_meta(
+    ids: list[str],
+    limiter: TokenBucket | None = None,
+    sizer: ChunkSizer | None = None,
+    cache: ResponseCache | None = None,
+) -> dict[str, GameMeta]:
+    if cache is not None and cache.offline:
+        return cache.load_meta(ids)
     if not os.getenv("BGG_TOKEN"):
-        raise RuntimeError("BGG_TOKEN is not set.")
+        raise AuthenticationError("BGG_TOKEN is not set.")
 
     request = build_request(ids)
-    last_error: Exception | None = None
+    last_error: FetchError | None = None
     for attempt in range(1, RETRY_MAX + 1):
+        if limiter is not None:
+            limiter.acquire()
+        started = time.monotonic()
         try:
-            with urllib.request.urlopen(request, timeout=30) as response:
-                status = getattr(response, "status", 200)
-                data = response.read().decode("utf-8")
-            if status in {500, 503}:
-                raise RuntimeError(f"HTTP {status}")
-            if "<message>" in data:
-                raise RuntimeError("BGG returned a message response (likely queued).")
-            return data
-        except (urllib.error.HTTPError, urllib.error.URLError, RuntimeError) as exc:
+            result = _request_meta(request, cache)
+        except AuthenticationError:
+            raise
+        except FetchError as exc:
             last_error = exc
-            if attempt < RETRY_MAX:
-                sleep_for = RETRY_BACKOFF_SECONDS * attempt
-                time.sleep(sleep_for)
-            else:
+            if sizer is not None and exc.retryable:
+                sizer.record_throttled()
+            if not exc.retryable or attempt == RETRY_MAX:
                 break
-    raise RuntimeError(f"Failed to fetch ids {ids}: {last_error}")
+            time.sleep(_backoff_delay(attempt, exc.retry_after))
+            continue
+        if sizer is not None:
+            sizer.record_success(time.monotonic() - started)
+        return result
+    assert last_error is not None
+    raise FetchError(
+        f"Failed to fetch ids {ids}: {last_error}",
+        retryable=last_error.retryable,
+        id_specific=last_error.id_specific,
+    ) from last_error
+
+
+def fetch_chunks(
+    ids: list[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: TokenBucket | None = None,
+    sizer: ChunkSizer | None = None,
+    cache: ResponseCache | None = None,
+) -> Iterator[tuple[list[str], dict[str, GameMeta] | RuntimeError]]:
+    """ids をチャンクに分けて取得し、チャンクごとのパース結果（または例外）を終わった順に返す。
+
+    チャンクは投入時点の sizer.size で切り出す。特定の id が原因になりうる失敗（400・不正な XML）の
+    チャンクは半分に分けて取り直し、1件になっても失敗した id だけを例外として返す。再試行し尽くした
+    一時的な失敗（5xx など）は、この実行で1件でも成功していれば同様に分割する。それ以外の失敗は
+    分割しない。認証の失敗（AuthenticationError）は送信済みでないチャンクを取り消して送出する。
+    """
+    sizer = sizer if sizer is not None else ChunkSizer()
+    pending = deque(ids)
+    split: deque[list[str]] = deque()
+    succeeded = False
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        in_flight: dict[Future[dict[str, GameMeta]], list[str]] = {}
+        while pending or split or in_flight:
+            while len(in_flight) < max(1, concurrency) and (pending or split):
+                if split:
+                    chunk = split.popleft()
+                else:
+                    chunk = [pending.popleft() for _ in range(min(sizer.size, len(pending)))]
+                in_flight[executor.submit(fetch_meta, chunk, limiter, sizer, cache)] = chunk
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                try:
+                    parsed = future.result()
+                except AuthenticationError:
+                    for other in in_flight:
+                        other.cancel()
+                    raise
+                except RuntimeError as exc:
+                    splittable = isinstance(exc, FetchError) and (
+                        exc.id_specific or (exc.retryable and succeeded)
+                    )
+                    if len(chunk) > 1 and splittable:
+                        middle = len(chunk) // 2
+                        split.extend((chunk[:middle], chunk[middle:]))
+                    else:
+                        yield chunk, exc
+                    continue
+                succeeded = True
+                yield chunk, parsed
 
 
 def _int_attr(node: ET.Element | None, key: str = "value") -> int | None:
@@ -168,19 +777,95 @@ def _normalize_url(text: str | None) -> str | None:
     return value
 
 
-def _load_image_bytes(url: str) -> bytes:
-    request = urllib.request.Request(
-        url,
-        headers={
-            "Accept": "image/*",
-            "User-Agent": "18xx-summary-site/1.0 (+https://boardgamegeek.com)",
-        },
-    )
-    with urllib.request.urlopen(request, timeout=IMAGE_TIMEOUT_SECONDS) as response:
-        return response.read()
+@dataclass
+class ImageResponse:
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+def _load_image(
+    url: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    cache: ResponseCache | None = None,
+) -> ImageResponse | None:
+    """画像を取得する。etag / last_modified を渡すと条件付きリクエストになり、304 なら None。
+
+    cache があれば取得した画像を記録し、offline ならキャッシュからだけ読む。
+    """
+    if cache is not None and cache.offline:
+        return cache.load_image(url)
+    headers = {
+        "Accept": "image/*",
+        "User-Agent": USER_AGENT,
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        with _http_pool.open(url, headers, timeout=IMAGE_TIMEOUT_SECONDS) as response:
+            image = ImageResponse(
+                body=response.read(),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+    except HttpError as exc:
+        if exc.code == 304:
+            return None
+        raise
+    if cache is not None:
+        cache.store_image(url, image)
+    return image
+
+
+def _variant_file_name(bgg_id: str, width: int, full_width: int, mime: str) -> str:
+    extension = "avif" if mime == "image/avif" else "webp"
+    if width == full_width:
+        return f"{bgg_id}.{extension}"
+    return f"{bgg_id}-{width}w.{extension}"
+
+
+def _expected_variants(full_width: int, widths: Iterable[int], avif: bool) -> list[tuple[int, str]]:
+    """本体の幅から、作るべき縮小版の (幅, MIME) を返す。本体より小さい幅だけを作る。"""
+    smaller = sorted({width for width in widths if 0 < width < full_width})
+    expected = [(width, "image/webp") for width in smaller]
+    if avif:
+        expected.extend((width, "image/avif") for width in [*smaller, full_width])
+    return expected
+
+
+def _extract_previous_variants(cover: dict, bgg_id: str, covers_dir: Path) -> list[dict] | None:
+    variants = cover.get("variants")
+    if not isinstance(variants, list):
+        return None
+    preserved: list[dict] = []
+    for variant in variants:
+        if not isinstance(variant, dict):
+            return None
+        path = variant.get("path")
+        width = variant.get("width")
+        height = variant.get("height")
+        mime = variant.get("type")
+        if not (
+            isinstance(path, str)
+            and isinstance(width, int)
+            and isinstance(height, int)
+            and mime in {"image/webp", "image/avif"}
+        ):
+            return None
+        name = _variant_file_name(bgg_id, width, cover["width"], mime)
+        # 1つでも欠けていれば縮小版はまとめて作り直す。
+        if path != f"assets/game-covers/{name}" or not (covers_dir / name).exists():
+            return None
+        preserved.append({"path": path, "width": width, "height": height, "type": mime})
+    return preserved
 
 
-def _extract_previous_cover(previous_entry: object, bgg_id: str) -> dict | None:
+def _extract_previous_cover(
+    previous_entry: object, bgg_id: str, covers_dir: Path | None = None
+) -> dict | None:
     if not isinstance(previous_entry, dict):
         return None
     cover = previous_entry.get("cover")
@@ -200,119 +885,465 @@ def _extract_previous_cover(previous_entry: object, bgg_id: str) -> dict | None:
         and height > 0
     ):
         expected = f"assets/game-covers/{bgg_id}.webp"
-        if path == expected and (COVERS_DIR / f"{bgg_id}.webp").exists():
-            return {
+        covers_dir = covers_dir if covers_dir is not None else COVERS_DIR
+        if path == expected and (covers_dir / f"{bgg_id}.webp").exists():
+            preserved = {
                 "path": path,
                 "width": width,
                 "height": height,
                 "source": source,
             }
+            variants = _extract_previous_variants(cover, bgg_id, covers_dir)
+            if variants:
+                preserved["variants"] = variants
+            placeholder = cover.get("placeholder")
+            if (
+                isinstance(placeholder, dict)
+                and isinstance(placeholder.get("color"), str)
+                and isinstance(placeholder.get("image"), str)
+            ):
+                preserved["placeholder"] = {
+                    "color": placeholder["color"],
+                    "image": placeholder["image"],
+                }
+            for key in COVER_VALIDATOR_KEYS:
+                if isinstance(cover.get(key), str):
+                    preserved[key] = cover[key]
+            return preserved
     return None
 
 
-def _generate_cover(bgg_id: str, image_url: str | None, thumbnail_url: str | None) -> dict | None:
-    global _PILLOW_MISSING_WARNED
-    if Image is None:
-        if not _PILLOW_MISSING_WARNED:
-            print("Cover generation skipped: Pillow is not installed.")
-            _PILLOW_MISSING_WARNED = True
+def _cover_placeholder(image: Image.Image) -> dict[str, str]:
+    """平均色と、幅 COVER_PLACEHOLDER_WIDTH の WebP を data URI にしたものを返す。"""
+    box = Image.Resampling.BOX if hasattr(Image, "Resampling") else Image.BOX
+    red, green, blue = image.resize((1, 1), resample=box).getpixel((0, 0))[:3]
+    width = min(COVER_PLACEHOLDER_WIDTH, image.width)
+    height = max(1, round(image.height * width / image.width))
+    buffer = io.BytesIO()
+    image.resize((width, height), resample=box).save(
+        buffer, format="WEBP", quality=COVER_PLACEHOLDER_QUALITY
+    )
+    return {
+        "color": f"#{red:02x}{green:02x}{blue:02x}",
+        "image": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+    }
+
+
+def _load_cover_placeholder(path: Path) -> dict[str, str] | None:
+    """生成済みのカバー画像からプレースホルダーを作る。再取得せずに後から付け足すときに使う。"""
+    try:
+        with Image.open(path) as loaded:
+            return _cover_placeholder(loaded.convert("RGB"))
+    except (OSError, UnidentifiedImageError):
         return None
 
-    candidates = [
-        ("image", image_url),
-        ("thumbnail", thumbnail_url),
-    ]
 
+def _encode_cover(
+    raw: bytes,
+    output_path: Path,
+    variant_widths: tuple[int, ...] = (),
+    avif: bool = False,
+) -> tuple[int, int, float, list[dict], dict[str, str]] | None:
+    """画像をデコード・縮小して WebP で保存する。ProcessPoolExecutor のワーカーで動く。
+
+    variant_widths の縮小版（avif なら AVIF 版も）を output_path と同じディレクトリに書き、
+    その (file, width, height, type) とプレースホルダーを返す。
+    """
+    start = time.perf_counter()
     resample = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
-    for source, url in candidates:
-        if not url:
-            continue
+    with Image.open(io.BytesIO(raw)) as loaded:
+        rgb = loaded.convert("RGB")
+        rgb.thumbnail((COVER_MAX_WIDTH, COVER_MAX_HEIGHT), resample=resample)
+
+        if rgb.width <= 0 or rgb.height <= 0:
+            return None
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        rgb.save(output_path, format="WEBP", quality=COVER_WEBP_QUALITY, method=COVER_WEBP_METHOD)
+
+        variants: list[dict] = []
+        for width, mime in _expected_variants(rgb.width, variant_widths, avif):
+            height = max(1, round(rgb.height * width / rgb.width))
+            image = rgb if width == rgb.width else rgb.resize((width, height), resample=resample)
+            name = _variant_file_name(output_path.stem, width, rgb.width, mime)
+            if mime == "image/avif":
+                image.save(output_path.with_name(name), format="AVIF", quality=COVER_AVIF_QUALITY)
+            else:
+                image.save(
+                    output_path.with_name(name),
+                    format="WEBP",
+                    quality=COVER_WEBP_QUALITY,
+                    method=COVER_WEBP_METHOD,
+                )
+            variants.append({"file": name, "width": width, "height": image.height, "type": mime})
+        placeholder = _cover_placeholder(rgb)
+    return rgb.width, rgb.height, time.perf_counter() - start, variants, placeholder
+
+
+@dataclass
+class StageTiming:
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+
+
+@dataclass
+class _CoverJob:
+    bgg_id: str
+    candidates: list[tuple[str, str | None]]
+    previous_cover: dict | None
+    output_path: Path
+    future: Future[dict | None]
+
+
+class CoverPipeline:
+    """カバー画像の取得（スレッドプール）と変換（プロセスプール）を行う独立したステージ。
+
+    submit() はすぐ戻るので、メタデータ取得と並行して画像処理が進む。ダウンロードスレッドは
+    変換をプロセスプールに投げたら完了を待たずに次のダウンロードへ進み、結果は変換の完了
+    コールバックで確定する（変換に失敗すれば、そこから次の候補のダウンロードを投入する）。
+    encode_workers が 1 以下なら変換はダウンロードスレッド内で行う。
+
+    変換した画像は staging ディレクトリに書き、close() で covers_dir に移す。例外で with を
+    抜けたとき（または cancel() 後）は、未処理の仕事を取り消して変換済みの画像も捨てる。
+    """
+
+    def __init__(
+        self,
+        download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        encode_workers: int = DEFAULT_ENCODE_WORKERS,
+        covers_dir: Path | None = None,
+        revalidate: bool = False,
+        cache: ResponseCache | None = None,
+        variant_widths: tuple[int, ...] = COVER_VARIANT_WIDTHS,
+        avif: bool = False,
+    ) -> None:
+        self.covers_dir = covers_dir if covers_dir is not None else COVERS_DIR
+        self._staging_dir = self.covers_dir / COVER_STAGING_DIR_NAME
+        self.revalidate = revalidate
+        self.cache = cache
+        self.variant_widths = variant_widths
+        self.avif = avif
+        self._downloads = ThreadPoolExecutor(max_workers=max(1, download_workers))
+        self._encoder: ProcessPoolExecutor | None = None
+        if encode_workers > 1:
+            # ワーカーはダウンロードスレッドから起動されるため、fork ではなく spawn を使う。
+            self._encoder = ProcessPoolExecutor(
+                max_workers=encode_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self._futures: dict[str, Future[dict | None]] = {}
+        self._lock = threading.Lock()
+        # staging に書き終えたファイル名。close() で covers_dir に移す。
+        self._staged: list[str] = []
+        self._cancelled = False
+        self._started = time.perf_counter()
+        self.download_timing = StageTiming()
+        self.encode_timing = StageTiming()
+        self.unchanged = 0
+        self.bytes_downloaded = 0
+
+    def __enter__(self) -> CoverPipeline:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc: object) -> None:
+        if exc_type is not None:
+            self.cancel()
+        self.close()
+
+    def cancel(self) -> None:
+        """未処理のダウンロードと変換を取り消し、変換済みの画像も covers_dir に移さないようにする。"""
+        with self._lock:
+            self._cancelled = True
+
+    def close(self) -> None:
+        if not self._cancelled:
+            # 変換の完了コールバックが次の候補のダウンロードを投入しうるので、先に全件の確定を待つ。
+            wait(list(self._futures.values()))
+        self._downloads.shutdown(wait=True, cancel_futures=self._cancelled)
+        if self._encoder is not None:
+            self._encoder.shutdown(wait=True, cancel_futures=self._cancelled)
+        if not self._cancelled:
+            for name in self._staged:
+                os.replace(self._staging_dir / name, self.covers_dir / name)
+        self._staged.clear()
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+
+    def submit(
+        self,
+        bgg_id: str,
+        image_url: str | None,
+        thumbnail_url: str | None,
+        previous_cover: dict | None = None,
+    ) -> None:
+        global _PILLOW_MISSING_WARNED
+        if Image is None:
+            if not _PILLOW_MISSING_WARNED:
+                print("Cover generation skipped: Pillow is not installed.")
+                _PILLOW_MISSING_WARNED = True
+            return
+        if previous_cover is not None and not self._variants_current(previous_cover):
+            # 縮小版の設定が変わった（または欠けている）ので、取得元が同じでも作り直す。
+            previous_cover = None
+        job = _CoverJob(
+            bgg_id=bgg_id,
+            candidates=[("image", image_url), ("thumbnail", thumbnail_url)],
+            previous_cover=previous_cover,
+            output_path=self.covers_dir / f"{bgg_id}.webp",
+            future=Future(),
+        )
+        self._futures[bgg_id] = job.future
+        self._downloads.submit(self._generate, job, 0)
+
+    def results(self) -> dict[str, dict | None]:
+        return {bgg_id: future.result() for bgg_id, future in self._futures.items()}
+
+    def report(self) -> str:
+        return (
+            f"Cover stage: {self.download_timing.count} download(s) "
+            f"{self.download_timing.seconds:.2f}s, "
+            f"{self.encode_timing.count} encode(s) {self.encode_timing.seconds:.2f}s "
+            f"(cumulative), wall {time.perf_counter() - self._started:.2f}s"
+        )
+
+    def _variants_current(self, cover: dict) -> bool:
+        """前回の cover が今の設定どおりの縮小版を持っているか。"""
+        expected = _expected_variants(cover["width"], self.variant_widths, self.avif)
+        actual = [(variant["width"], variant["type"]) for variant in cover.get("variants", [])]
+        return sorted(actual) == sorted(expected)
+
+    def _reuse(self, cover: dict, output_path: Path) -> dict:
+        """前回の cover をそのまま使う。プレースホルダーが無ければ手元の画像から足す。"""
+        with self._lock:
+            self.unchanged += 1
+        if "placeholder" in cover:
+            return cover
+        placeholder = _load_cover_placeholder(output_path)
+        return {**cover, "placeholder": placeholder} if placeholder else cover
+
+    def _generate(self, job: _CoverJob, start: int) -> None:
+        """ダウンロードスレッドで実行する。結果（または例外）は job.future に入れる。"""
         try:
-            raw = _load_image_bytes(url)
-            with Image.open(io.BytesIO(raw)) as loaded:
-                rgb = loaded.convert("RGB")
-                rgb.thumbnail((COVER_MAX_WIDTH, COVER_MAX_HEIGHT), resample=resample)
+            self._try_candidates(job, start)
+        except BaseException as exc:
+            job.future.set_exception(exc)
 
-                if rgb.width <= 0 or rgb.height <= 0:
-                    continue
+    def _try_candidates(self, job: _CoverJob, start: int) -> None:
+        previous_cover = job.previous_cover
+        for index in range(start, len(job.candidates)):
+            source, url = job.candidates[index]
+            if not url:
+                continue
+            # 前回と同じ取得元 URL なら、既存のファイルをそのまま使う（revalidate 時は条件付きリクエスト）。
+            same_source = (
+                previous_cover is not None
+                and previous_cover.get("source") == source
+                and previous_cover.get("source_url") == url
+            )
+            if same_source and not self.revalidate:
+                job.future.set_result(self._reuse(previous_cover, job.output_path))
+                return
+            try:
+                started = time.perf_counter()
+                response = _load_image(
+                    url,
+                    etag=previous_cover.get("etag") if same_source else None,
+                    last_modified=previous_cover.get("last_modified") if same_source else None,
+                    cache=self.cache,
+                )
+                with self._lock:
+                    self.download_timing.add(time.perf_counter() - started)
+                    self.bytes_downloaded += len(response.body) if response else 0
+                if response is None:
+                    job.future.set_result(self._reuse(previous_cover, job.output_path))
+                    return
 
-                COVERS_DIR.mkdir(parents=True, exist_ok=True)
-                output_path = COVERS_DIR / f"{bgg_id}.webp"
-                rgb.save(output_path, format="WEBP", quality=COVER_WEBP_QUALITY, method=6)
-        except (
-            OSError,
-            urllib.error.URLError,
-            urllib.error.HTTPError,
-            UnidentifiedImageError,
-        ) as exc:
-            print(f"Cover fetch failed for {bgg_id} ({source}): {exc}")
-            continue
+                digest = hashlib.sha256(response.body).hexdigest()
+                validators = {
+                    "source_url": url,
+                    "etag": response.etag,
+                    "last_modified": response.last_modified,
+                    "sha256": digest,
+                }
+                if (
+                    previous_cover is not None
+                    and previous_cover.get("source") == source
+                    and previous_cover.get("sha256") == digest
+                ):
+                    # URL が変わっても中身が同じなら再エンコードしない。
+                    job.future.set_result(
+                        _with_validators(self._reuse(previous_cover, job.output_path), validators)
+                    )
+                    return
+                staged_path = self._staging_dir / job.output_path.name
+                if self._encoder is not None:
+                    encoding = self._encoder.submit(
+                        _encode_cover, response.body, staged_path, self.variant_widths, self.avif
+                    )
+                    encoding.add_done_callback(partial(self._encoded, job, index, source, validators))
+                    return
+                encoded = _encode_cover(response.body, staged_path, self.variant_widths, self.avif)
+            except (
+                OSError,
+                http.client.HTTPException,
+                UnidentifiedImageError,
+            ) as exc:
+                print(f"Cover fetch failed for {job.bgg_id} ({source}): {exc}")
+                continue
+            if encoded is not None:
+                job.future.set_result(self._build_cover(job.bgg_id, source, validators, encoded))
+                return
+        job.future.set_result(None)
 
-        return {
+    def _encoded(
+        self,
+        job: _CoverJob,
+        index: int,
+        source: str,
+        validators: dict[str, str | None],
+        encoding: Future,
+    ) -> None:
+        """変換の完了コールバック。失敗していれば次の候補をダウンロードスレッドに投入する。"""
+        try:
+            encoded = encoding.result()
+        except (OSError, UnidentifiedImageError) as exc:
+            print(f"Cover fetch failed for {job.bgg_id} ({source}): {exc}")
+            encoded = None
+        except BaseException as exc:
+            job.future.set_exception(exc)
+            return
+        if encoded is not None:
+            job.future.set_result(self._build_cover(job.bgg_id, source, validators, encoded))
+        elif self._cancelled:
+            # 中断後はダウンロードのプールが閉じているので、次の候補は試さない。
+            job.future.set_result(None)
+        else:
+            self._downloads.submit(self._generate, job, index + 1)
+
+    def _build_cover(
+        self,
+        bgg_id: str,
+        source: str,
+        validators: dict[str, str | None],
+        encoded: tuple[int, int, float, list[dict], dict[str, str]],
+    ) -> dict:
+        width, height, seconds, variants, placeholder = encoded
+        with self._lock:
+            self.encode_timing.add(seconds)
+            self._staged.append(f"{bgg_id}.webp")
+            self._staged.extend(variant["file"] for variant in variants)
+        cover = {
             "path": f"assets/game-covers/{bgg_id}.webp",
-            "width": rgb.width,
-            "height": rgb.height,
+            "width": width,
+            "height": height,
             "source": source,
         }
+        if variants:
+            cover["variants"] = [
+                {
+                    "path": f"assets/game-covers/{variant['file']}",
+                    "width": variant["width"],
+                    "height": variant["height"],
+                    "type": variant["type"],
+                }
+                for variant in variants
+            ]
+        cover["placeholder"] = placeholder
+        return _with_validators(cover, validators)
 
-    return None
 
+def _with_validators(cover: dict, validators: dict[str, str | None]) -> dict:
+    updated = {key: value for key, value in cover.items() if key not in COVER_VALIDATOR_KEYS}
+    updated.update({key: value for key, value in validators.items() if value is not None})
+    return updated
 
-def parse_xml(xml_text: str) -> dict[str, GameMeta]:
-    root = ET.fromstring(xml_text)
-    result: dict[str, GameMeta] = {}
-    for item in root.findall("item"):
-        item_id = item.get("id")
-        if not item_id:
+
+def _parse_item(item: ET.Element) -> tuple[str, GameMeta] | None:
+    item_id = item.get("id")
+    if not item_id:
+        return None
+
+    name = None
+    for name_node in item.findall("name"):
+        if name_node.get("type") == "primary":
+            name = name_node.get("value")
+            break
+    if name is None:
+        name_node = item.find("name")
+        if name_node is not None:
+            name = name_node.get("value")
+
+    min_players = _int_attr(item.find("minplayers"))
+    max_players = _int_attr(item.find("maxplayers"))
+
+    min_play_time = _int_attr(item.find("minplaytime"))
+    max_play_time = _int_attr(item.find("maxplaytime"))
+    if min_play_time is None or max_play_time is None:
+        playing_time = _int_attr(item.find("playingtime"))
+        if min_play_time is None:
+            min_play_time = playing_time
+        if max_play_time is None:
+            max_play_time = playing_time
+
+    year_published = _int_attr(item.find("yearpublished"))
+    min_age = _int_attr(item.find("minage"))
+
+    designers = [
+        link.get("value")
+        for link in item.findall("link")
+        if link.get("type") == "boardgamedesigner" and link.get("value")
+    ]
+
+    image_url = _normalize_url(item.findtext("image"))
+    thumbnail_url = _normalize_url(item.findtext("thumbnail"))
+
+    return item_id, GameMeta(
+        name=name,
+        players_min=min_players,
+        players_max=max_players,
+        time_min=min_play_time,
+        time_max=max_play_time,
+        year_published=year_published,
+        min_age=min_age,
+        designers=designers,
+        image_url=image_url,
+        thumbnail_url=thumbnail_url,
+    )
+
+
+def iter_game_meta(stream: IO[bytes]) -> Iterator[tuple[str, GameMeta]]:
+    """レスポンスを先頭から読みながら <item> ごとに GameMeta を返す。
+
+    処理済みの <item> は都度破棄するので、保持するのは処理中の1件分だけ。
+    ルートが <message>（BGG のキュー待ち応答）の場合は QueuedResponseError、
+    <items> 以外の場合は再試行しない FetchError。
+    """
+    root: ET.Element | None = None
+    depth = 0
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = element
+                if element.tag == "message":
+                    raise QueuedResponseError("BGG returned a message response (likely queued).")
+                if element.tag != "items":
+                    raise FetchError(
+                        f"Unexpected root element <{element.tag}>.", retryable=False, id_specific=True
+                    )
             continue
+        depth -= 1
+        if depth == 1 and element.tag == "item":
+            parsed = _parse_item(element)
+            if parsed is not None:
+                yield parsed
+            root.clear()
 
-        name = None
-        for name_node in item.findall("name"):
-            if name_node.get("type") == "primary":
-                name = name_node.get("value")
-                break
-        if name is None:
-            name_node = item.find("name")
-            if name_node is not None:
-                name = name_node.get("value")
-
-        min_players = _int_attr(item.find("minplayers"))
-        max_players = _int_attr(item.find("maxplayers"))
-
-        min_play_time = _int_attr(item.find("minplaytime"))
-        max_play_time = _int_attr(item.find("maxplaytime"))
-        if min_play_time is None or max_play_time is None:
-            playing_time = _int_attr(item.find("playingtime"))
-            if min_play_time is None:
-                min_play_time = playing_time
-            if max_play_time is None:
-                max_play_time = playing_time
-
-        year_published = _int_attr(item.find("yearpublished"))
-        min_age = _int_attr(item.find("minage"))
-
-        designers = [
-            link.get("value")
-            for link in item.findall("link")
-            if link.get("type") == "boardgamedesigner" and link.get("value")
-        ]
-
-        image_url = _normalize_url(item.findtext("image"))
-        thumbnail_url = _normalize_url(item.findtext("thumbnail"))
-
-        result[item_id] = GameMeta(
-            name=name,
-            players_min=min_players,
-            players_max=max_players,
-            time_min=min_play_time,
-            time_max=max_play_time,
-            year_published=year_published,
-            min_age=min_age,
-            designers=designers,
-            image_url=image_url,
-            thumbnail_url=thumbnail_url,
-        )
-    return result
+
+def parse_xml(xml_text: str) -> dict[str, GameMeta]:
+    return dict(iter_game_meta(io.BytesIO(xml_text.encode("utf-8"))))
 
 
 def load_previous_json(path: Path) -> dict[str, dict]:
@@ -325,52 +1356,329 @@ def load_previous_json(path: Path) -> dict[str, dict]:
         return {}
 
 
-def write_json(path: Path, payload: dict[str, dict]) -> None:
+def _shard_name(bgg_id: str) -> str:
+    return f"{zlib.crc32(bgg_id.encode('utf-8')) % META_SHARD_COUNT:02x}"
+
+
+def load_previous_sharded(root: Path) -> dict[str, dict]:
+    index = load_previous_json(root / "index.json")
+    shards = index.get("shards") if index.get("version") == META_SHARDS_VERSION else None
+    if not isinstance(shards, dict):
+        return {}
+    result: dict[str, dict] = {}
+    for name in shards:
+        result.update(load_previous_json(root / f"{name}.json"))
+    return result
+
+
+def load_previous_meta() -> dict[str, dict]:
+    """前回の結果を読む。分割レイアウトがあればそちらを優先する（main.py と同じ順）。"""
+    if (OUTPUT_SHARDS_DIR / "index.json").exists():
+        return load_previous_sharded(OUTPUT_SHARDS_DIR)
+    return load_previous_json(OUTPUT_JSON)
+
+
+def _replace_text(path: Path, text: str) -> None:
+    """一時ファイルに書いてから置き換える。
+
+    main.py は bgg-meta.json を mmap するので、開いたままのファイルをその場で切り詰めて書き直してはいけない
+    （読み手が SIGBUS で落ちる）。置き換えなら読み手は古い内容を読み切れる。
+    """
+    temporary = path.with_name(f"{path.name}.tmp")
+    with temporary.open("w", encoding="utf-8", newline="\n") as handle:
+        handle.write(text)
+    os.replace(temporary, path)
+
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    _replace_text(path, text)
+    return True
+
+
+def write_sharded(root: Path, payload: dict[str, dict]) -> list[Path]:
+    """payload を分割ファイルに書く。内容が変わったファイルだけを書き換え、書き換え・削除したパスを返す。
+
+    index.json には分割ファイルごとの id 一覧を持たせ、main.py が参照された id の分割ファイルだけを読めるようにする。
+    """
+    shards: dict[str, dict[str, dict]] = {}
+    for bgg_id, entry in payload.items():
+        shards.setdefault(_shard_name(bgg_id), {})[bgg_id] = entry
+
+    root.mkdir(parents=True, exist_ok=True)
+    changed: list[Path] = []
+    for name, entries in sorted(shards.items()):
+        path = root / f"{name}.json"
+        text = json.dumps(entries, ensure_ascii=True, indent=2, sort_keys=True) + "\n"
+        if _write_if_changed(path, text):
+            changed.append(path)
+    for path in sorted(root.glob("*.json")):
+        if path.name != "index.json" and path.stem not in shards:
+            path.unlink()
+            changed.append(path)
+
+    index = {
+        "version": META_SHARDS_VERSION,
+        "shard_count": META_SHARD_COUNT,
+        "shards": {name: sorted(entries) for name, entries in shards.items()},
+    }
+    index_path = root / "index.json"
+    if _write_if_changed(index_path, json.dumps(index, ensure_ascii=True, indent=2, sort_keys=True) + "\n"):
+        changed.append(index_path)
+    return changed
+
+
+def _dump_with_offsets(payload: dict[str, dict]) -> tuple[str, list[tuple[int, int, int]]]:
+    """json.dump(indent=2, sort_keys=True, ensure_ascii=True) と同じ文字列と、各値の (id, 位置, 長さ) を返す。
+
+    ensure_ascii なので文字数とバイト数は一致する。
+    """
+    if not payload:
+        return "{}\n", []
+    parts = ["{\n"]
+    position = 2
+    records: list[tuple[int, int, int]] = []
+    for index, key in enumerate(sorted(payload)):
+        if index:
+            parts.append(",\n")
+            position += 2
+        prefix = f"  {json.dumps(key)}: "
+        value = json.dumps(payload[key], ensure_ascii=True, indent=2, sort_keys=True)
+        value = value.replace("\n", "\n  ")
+        parts.append(prefix)
+        parts.append(value)
+        position += len(prefix)
+        records.append((int(key), position, len(value)))
+        position += len(value)
+    parts.append("\n}\n")
+    return "".join(parts), records
+
+
+def _write_meta_index(path: Path, json_size: int, records: list[tuple[int, int, int]]) -> None:
+    buffer = bytearray(META_INDEX_HEADER.pack(META_INDEX_MAGIC, json_size, len(records)))
+    for record in sorted(records):
+        buffer += META_INDEX_RECORD.pack(*record)
+    temporary = path.with_name(f"{path.name}.tmp")
+    temporary.write_bytes(buffer)
+    os.replace(temporary, path)
+
+
+def write_json(path: Path, payload: dict[str, dict], index_path: Path | None = None) -> None:
+    """payload を書く。index_path を渡すと、id ごとの位置を記録した索引も書く。"""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8", newline="\n") as handle:
-        json.dump(payload, handle, ensure_ascii=True, indent=2, sort_keys=True)
-        handle.write("\n")
+    # 索引のキーは正規化された数値 id に限る（main.py はそれ以外を索引から引かない）。
+    indexable = index_path is not None and all(
+        key.isascii() and key.isdigit() and str(int(key)) == key for key in payload
+    )
+    if not indexable:
+        _replace_text(path, json.dumps(payload, ensure_ascii=True, indent=2, sort_keys=True) + "\n")
+        if index_path is not None:
+            print(f"Skipped {index_path}: bgg-meta.json has non-numeric ids.")
+            index_path.unlink(missing_ok=True)
+        return
+
+    text, records = _dump_with_offsets(payload)
+    _replace_text(path, text)
+    _write_meta_index(index_path, len(text), records)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Fetch BoardGameGeek metadata and covers for docs/games.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of API requests in flight.",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=1 / REQUEST_SLEEP_SECONDS,
+        help="Maximum API requests per second (including retries).",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help="Threads downloading cover images.",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=DEFAULT_ENCODE_WORKERS,
+        help="Processes decoding/resizing/encoding covers (1 = encode in download threads).",
+    )
+    parser.add_argument(
+        "--revalidate-covers",
+        action="store_true",
+        help="Send conditional requests for covers whose source URL is unchanged.",
+    )
+    parser.add_argument(
+        "--avif",
+        action="store_true",
+        help="Also write AVIF covers (requires Pillow built with AVIF support).",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=("json", "sharded"),
+        default="json",
+        help=f"Write a single {OUTPUT_JSON.name} or shards under {OUTPUT_SHARDS_DIR}/ (only changed shards are rewritten).",
+    )
+    parser.add_argument(
+        "--write-index",
+        action="store_true",
+        help=f"Also write {OUTPUT_INDEX.name}, an offset index main.py uses to read only referenced ids.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Store raw API responses and images in --cache-dir.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay responses from --cache-dir without network access or BGG_TOKEN.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=RESPONSE_CACHE_DIR,
+        help=f"Directory of the raw response cache (default: {RESPONSE_CACHE_DIR}).",
+    )
+    refresh = parser.add_mutually_exclusive_group()
+    refresh.add_argument(
+        "--stale-after",
+        type=float,
+        metavar="DAYS",
+        help=(
+            "Only fetch ids that are new or whose fetched_at is older than DAYS "
+            f"(default with --layout sharded: {SHARDED_STALE_AFTER_DAYS:g}; 0 fetches every id)."
+        ),
+    )
+    refresh.add_argument(
+        "--only-new",
+        action="store_true",
+        help="Only fetch ids that are not in bgg-meta.json yet.",
+    )
+    args = parser.parse_args()
+    if args.write_index and args.layout != "json":
+        parser.error("--write-index only applies to --layout json.")
+    if args.layout == "sharded" and args.stale_after is None and not args.only_new:
+        args.stale_after = SHARDED_STALE_AFTER_DAYS
+
     ids = collect_bgg_ids(GAMES_DIR)
     if not ids:
         print("No bgg_id found. Skipping.")
         return
 
-    previous = load_previous_json(OUTPUT_JSON)
+    previous = load_previous_meta()
     result: dict[str, dict] = {}
+    fetched_ids: list[str] = []
 
-    chunks = chunked(ids, CHUNK_SIZE)
-    for index, chunk in enumerate(chunks, start=1):
-        print(f"Fetching {index}/{len(chunks)}: {', '.join(chunk)}")
+    now = datetime.now(timezone.utc)
+    stale_after = timedelta(days=args.stale_after) if args.stale_after is not None else None
+    targets = select_ids_to_fetch(ids, previous, now, stale_after=stale_after, only_new=args.only_new)
+    target_set = set(targets)
+    for bgg_id in ids:
+        if bgg_id not in target_set and bgg_id in previous:
+            result[bgg_id] = previous[bgg_id]
+
+    cache = ResponseCache(args.cache_dir, offline=args.offline) if args.cache or args.offline else None
+    avif = args.avif
+    if avif and (Image is None or not features.check("avif")):
+        print("AVIF covers skipped: this Pillow build has no AVIF support.")
+        avif = False
+    limiter = TokenBucket(rate=args.rate)
+    sizer = ChunkSizer()
+    print(
+        f"Fetching {len(targets)} of {len(ids)} id(s) "
+        f"(chunk size<={CHUNK_SIZE}, concurrency={args.concurrency})."
+    )
+    fetched = fetch_chunks(
+        targets, concurrency=args.concurrency, limiter=limiter, sizer=sizer, cache=cache
+    )
+    done = 0
+    with CoverPipeline(
+        args.download_workers,
+        args.encode_workers,
+        revalidate=args.revalidate_covers,
+        cache=cache,
+        avif=avif,
+    ) as covers:
         try:
-            xml_text = fetch_xml(chunk)
-            parsed = parse_xml(xml_text)
-            for bgg_id in chunk:
-                meta = parsed.get(bgg_id)
-                if meta:
-                    current = meta.to_json()
-                    cover = _generate_cover(bgg_id, meta.image_url, meta.thumbnail_url)
-                    if cover:
-                        current["cover"] = cover
-                    else:
-                        preserved_cover = _extract_previous_cover(previous.get(bgg_id), bgg_id)
-                        if preserved_cover:
-                            current["cover"] = preserved_cover
-                    result[bgg_id] = current
-                elif bgg_id in previous:
-                    result[bgg_id] = previous[bgg_id]
-        except RuntimeError as exc:
-            print(f"Fetch failed for chunk {chunk}: {exc}")
-            for bgg_id in chunk:
-                if bgg_id in previous:
-                    result[bgg_id] = previous[bgg_id]
-        if index < len(chunks):
-            time.sleep(REQUEST_SLEEP_SECONDS)
-
-    write_json(OUTPUT_JSON, result)
-    print(f"Wrote {OUTPUT_JSON}")
+            for chunk, parsed in fetched:
+                done += len(chunk)
+                print(f"Fetched {done}/{len(targets)}: {', '.join(chunk)}")
+                try:
+                    if isinstance(parsed, RuntimeError):
+                        raise parsed
+                    for bgg_id in chunk:
+                        meta = parsed.get(bgg_id)
+                        if meta:
+                            result[bgg_id] = meta.to_json()
+                            fetched_at = cache.fetched_at(bgg_id) if args.offline else None
+                            result[bgg_id]["fetched_at"] = fetched_at or _format_timestamp(now)
+                            fetched_ids.append(bgg_id)
+                            covers.submit(
+                                bgg_id,
+                                meta.image_url,
+                                meta.thumbnail_url,
+                                _extract_previous_cover(previous.get(bgg_id), bgg_id),
+                            )
+                        elif bgg_id in previous:
+                            result[bgg_id] = previous[bgg_id]
+                except RuntimeError as exc:
+                    print(f"Fetch failed for chunk {chunk}: {exc}")
+                    for bgg_id in chunk:
+                        if bgg_id in previous:
+                            result[bgg_id] = previous[bgg_id]
+        except AuthenticationError as exc:
+            # 残りのチャンクも同じ理由で失敗するので、何も書き換えずに終了する。
+            # with を例外で抜けるので、CoverPipeline も未処理のカバーを取り消し、変換済みの画像を捨てる。
+            _http_pool.close()
+            raise SystemExit(f"Aborted: {exc}. Previous metadata was left unchanged.") from exc
+
+        cover_results = covers.results()
+        print(covers.report())
+    print(_http_pool.report())
+    _http_pool.close()
+    if cache is not None:
+        if not cache.offline:
+            cache.save()
+        print(cache.report())
+
+    for bgg_id in fetched_ids:
+        cover = cover_results.get(bgg_id)
+        if cover:
+            result[bgg_id]["cover"] = cover
+        else:
+            preserved_cover = _extract_previous_cover(previous.get(bgg_id), bgg_id)
+            if preserved_cover:
+                result[bgg_id]["cover"] = preserved_cover
+
+    if args.layout == "sharded":
+        changed = write_sharded(OUTPUT_SHARDS_DIR, result)
+        print(f"Updated {len(changed)} file(s) under {OUTPUT_SHARDS_DIR}")
+        # main.py は分割レイアウトを優先するので、古い単一ファイルは残さない。
+        stale = [OUTPUT_JSON, OUTPUT_INDEX]
+    else:
+        write_json(OUTPUT_JSON, result, OUTPUT_INDEX if args.write_index else None)
+        print(f"Wrote {OUTPUT_JSON}")
+        stale = sorted(OUTPUT_SHARDS_DIR.glob("*.json"))
+        if not args.write_index and OUTPUT_INDEX.exists():
+            # 書き直した JSON と位置が合わない古い索引を残すと、main.py が誤った範囲を読む。
+            OUTPUT_INDEX.unlink()
+            print(f"Removed {OUTPUT_INDEX} (not rewritten without --write-index)")
+    for path in stale:
+        if path.exists():
+            path.unlink()
+            print(f"Removed {path} (replaced by --layout {args.layout})")
 
 
 if __name__ == "__main__":
@@ -1,23 +1,85 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from html.parser import HTMLParser
 from pathlib import Path
+from typing import Iterator, TextIO
 
 import markdown
 
 GAMES_DIR = Path("docs/games")
 ASSETS_DIR = Path("docs/assets")
+MANIFEST_NAME = "text-export-manifest.json"
+# 変換結果が変わる修正を入れたら上げる。上がると全ゲームが再生成される。
+EXPORTER_VERSION = 1
 
 ACTIONS_BLOCK = re.compile(r'<div class="actions">.*?</div>', re.DOTALL)
+MARKDOWN_EXTENSIONS = [
+    "tables",
+    "fenced_code",
+    "pymdownx.tabbed",
+    "pymdownx.superfences",
+]
+
+
+BLOCK_TAGS = frozenset(
+    {
+        "p",
+        "div",
+        "section",
+        "article",
+        "header",
+        "footer",
+        "li",
+        "ul",
+        "ol",
+        "blockquote",
+        "pre",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+    }
+)
+WHITESPACE_RUN = re.compile(r"\s+")
+# str.splitlines() と同じ改行文字の集合。
+LINE_BREAK = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
 
 
 class PlainTextExtractor(HTMLParser):
-    def __init__(self) -> None:
+    """HTML をプレーンテキストに変換し、行単位で整形しながら sink へ書き出す。
+
+    行末の空白除去・連続空行の圧縮・前後の空行除去はストリーミングで行うため、
+    保持するのは書きかけの1行分だけで済む。sink を省略すると内部バッファに書き、
+    get_text() で取り出せる。
+    """
+
+    def __init__(self, sink: TextIO | None = None) -> None:
         super().__init__()
-        self.parts: list[str] = []
+        if sink is not None:
+            self.reset(sink)
+
+    def reset(self, sink: TextIO | None = None) -> None:
+        # HTMLParser.__init__ からも呼ばれる。使い回すときは文書ごとに呼び直す。
+        super().reset()
         self.in_row = False
         self.cell_index = 0
+        self._buffered = sink is None
+        self._sink: TextIO = io.StringIO() if sink is None else sink
+        self._last_char = ""
+        self._line_parts: list[str] = []
+        self._pending_cr = False
+        self._started = False
+        self._pending_blank = False
 
     def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:  # noqa: ARG002
         if tag == "table":
@@ -30,39 +92,21 @@ class PlainTextExtractor(HTMLParser):
             return
         if tag in {"td", "th"}:
             if self.in_row and self.cell_index > 0:
-                self.parts.append(" | ")
+                self._write(" | ")
             self.cell_index += 1
             return
-        if tag in {
-            "p",
-            "div",
-            "section",
-            "article",
-            "header",
-            "footer",
-            "li",
-            "ul",
-            "ol",
-            "blockquote",
-            "pre",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "h5",
-            "h6",
-        }:
+        if tag in BLOCK_TAGS:
             if self.in_row:
                 self._ensure_space()
             else:
                 self._ensure_newline()
             if tag == "li":
-                self.parts.append("・")
+                self._write("・")
         if tag == "br":
             if self.in_row:
                 self._ensure_space()
             else:
-                self.parts.append("\n")
+                self._write("\n")
 
     def handle_endtag(self, tag: str) -> None:
         if tag == "tr":
@@ -72,25 +116,7 @@ class PlainTextExtractor(HTMLParser):
         if tag == "table":
             self._ensure_newline()
             return
-        if tag in {
-            "p",
-            "div",
-            "section",
-            "article",
-            "header",
-            "footer",
-            "li",
-            "ul",
-            "ol",
-            "blockquote",
-            "pre",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "h5",
-            "h6",
-        }:
+        if tag in BLOCK_TAGS:
             if self.in_row:
                 self._ensure_space()
             else:
@@ -98,66 +124,205 @@ class PlainTextExtractor(HTMLParser):
 
     def handle_data(self, data: str) -> None:
         if self.in_row:
-            data = re.sub(r"\s+", " ", data)
+            data = WHITESPACE_RUN.sub(" ", data)
         if data.strip():
-            self.parts.append(data)
+            self._write(data)
 
     def _ensure_newline(self) -> None:
-        if self.parts and not self.parts[-1].endswith("\n"):
-            self.parts.append("\n")
+        if self._last_char and self._last_char != "\n":
+            self._write("\n")
 
     def _ensure_space(self) -> None:
-        if not self.parts:
+        if self._last_char and not self._last_char.isspace():
+            self._write(" ")
+
+    def _write(self, text: str) -> None:
+        self._last_char = text[-1]
+        if self._pending_cr:
+            # 前のチャンクが "\r" で終わっていた場合、続く "\n" は同じ改行の一部。
+            self._pending_cr = False
+            if text.startswith("\n"):
+                text = text[1:]
+        position = 0
+        for match in LINE_BREAK.finditer(text):
+            self._line_parts.append(text[position : match.start()])
+            self._emit_line("".join(self._line_parts))
+            self._line_parts.clear()
+            position = match.end()
+        if position < len(text):
+            self._line_parts.append(text[position:])
+        self._pending_cr = text.endswith("\r")
+
+    def _emit_line(self, line: str) -> None:
+        line = line.rstrip()
+        if not line:
+            if self._started:
+                self._pending_blank = True
             return
-        if not self.parts[-1][-1].isspace():
-            self.parts.append(" ")
+        if self._started:
+            self._sink.write("\n\n" if self._pending_blank else "\n")
+        else:
+            line = line.lstrip()
+            self._started = True
+        self._pending_blank = False
+        self._sink.write(line)
+
+    def finish(self) -> None:
+        """書きかけの行を出力し、末尾の改行を書く。"""
+        if self._line_parts:
+            self._emit_line("".join(self._line_parts))
+            self._line_parts.clear()
+        self._sink.write("\n")
 
     def get_text(self) -> str:
-        text = "".join(self.parts)
-        lines = [line.rstrip() for line in text.splitlines()]
-        deduped: list[str] = []
-        previous_blank = False
-        for line in lines:
-            if not line.strip():
-                if not previous_blank:
-                    deduped.append("")
-                previous_blank = True
-                continue
-            deduped.append(line)
-            previous_blank = False
-        return "\n".join(deduped).strip() + "\n"
+        self.finish()
+        if not self._buffered:
+            return ""
+        return self._sink.getvalue()
 
 
-def markdown_to_text(content: str) -> str:
+_converter: markdown.Markdown | None = None
+_extractor: PlainTextExtractor | None = None
+
+
+def _get_converter() -> markdown.Markdown:
+    # 拡張の登録は重いので、プロセス（ワーカー）ごとに一度だけ行い、文書ごとに reset() する。
+    global _converter
+    if _converter is None:
+        _converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, output_format="html5")
+    return _converter
+
+
+def _get_extractor() -> PlainTextExtractor:
+    global _extractor
+    if _extractor is None:
+        _extractor = PlainTextExtractor()
+    return _extractor
+
+
+def write_markdown_text(content: str, sink: TextIO) -> None:
     cleaned = ACTIONS_BLOCK.sub("", content)
-    html = markdown.markdown(
-        cleaned,
-        extensions=[
-            "tables",
-            "fenced_code",
-            "pymdownx.tabbed",
-            "pymdownx.superfences",
-        ],
-        output_format="html5",
-    )
-    parser = PlainTextExtractor()
+    converter = _get_converter()
+    try:
+        html = converter.convert(cleaned)
+    finally:
+        converter.reset()
+    parser = _get_extractor()
+    parser.reset(sink)
     parser.feed(html)
-    return parser.get_text()
+    parser.finish()
+
+
+def markdown_to_text(content: str) -> str:
+    buffer = io.StringIO()
+    write_markdown_text(content, buffer)
+    return buffer.getvalue()
 
 
-def export_texts() -> None:
+@dataclass
+class ExportSummary:
+    regenerated: list[Path]
+    skipped: list[Path]
+
+
+def _source_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: Path) -> dict[str, str]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("exporter_version") != EXPORTER_VERSION:
+        return {}
+    games = payload.get("games")
+    if not isinstance(games, dict):
+        return {}
+    return {
+        stem: entry["source_sha256"]
+        for stem, entry in games.items()
+        if isinstance(entry, dict) and isinstance(entry.get("source_sha256"), str)
+    }
+
+
+def write_manifest(path: Path, hashes: dict[str, str]) -> None:
+    payload = {
+        "exporter_version": EXPORTER_VERSION,
+        "games": {stem: {"source_sha256": digest} for stem, digest in hashes.items()},
+    }
+    with path.open("w", encoding="utf-8", newline="\n") as handle:
+        json.dump(payload, handle, ensure_ascii=False, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def _convert_parallel(contents: list[str], jobs: int) -> Iterator[str]:
+    with ProcessPoolExecutor(max_workers=min(jobs, len(contents))) as executor:
+        # map() は投入順に結果を返すので、書き込み順はソート済みのまま保たれる。
+        yield from executor.map(markdown_to_text, contents)
+
+
+def export_texts(force: bool = False, jobs: int = 1) -> ExportSummary:
     ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+    manifest_path = ASSETS_DIR / MANIFEST_NAME
+    previous = {} if force else load_manifest(manifest_path)
+    hashes: dict[str, str] = {}
+    summary = ExportSummary(regenerated=[], skipped=[])
+
+    pending: list[tuple[Path, str]] = []
     games = sorted(path for path in GAMES_DIR.glob("*.md") if path.stem != "index")
     for md_path in games:
-        text = markdown_to_text(md_path.read_text(encoding="utf-8"))
+        content = md_path.read_text(encoding="utf-8")
+        digest = _source_hash(content)
+        hashes[md_path.stem] = digest
         asset_path = ASSETS_DIR / f"{md_path.stem}.txt"
-        with asset_path.open("w", encoding="utf-8", newline="\n") as handle:
-            handle.write(text)
-        print(f"Wrote {asset_path}")
+        if previous.get(md_path.stem) == digest and asset_path.exists():
+            summary.skipped.append(asset_path)
+            continue
+        pending.append((asset_path, content))
+
+    if jobs <= 1 or len(pending) <= 1:
+        for asset_path, content in pending:
+            with asset_path.open("w", encoding="utf-8", newline="\n") as handle:
+                write_markdown_text(content, handle)
+            summary.regenerated.append(asset_path)
+            print(f"Wrote {asset_path}")
+    else:
+        texts = _convert_parallel([content for _, content in pending], jobs)
+        for (asset_path, _), text in zip(pending, texts):
+            with asset_path.open("w", encoding="utf-8", newline="\n") as handle:
+                handle.write(text)
+            summary.regenerated.append(asset_path)
+            print(f"Wrote {asset_path}")
+
+    if hashes != previous or force:
+        write_manifest(manifest_path, hashes)
+    return summary
 
 
 def main() -> None:
-    export_texts()
+    parser = argparse.ArgumentParser(
+        description="Export docs/games/*.md to plain text files under docs/assets.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every text file even if the source is unchanged.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (0 = CPU count, 1 = convert in-process).",
+    )
+    args = parser.parse_args()
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    summary = export_texts(force=args.force, jobs=jobs)
+    print(
+        f"Exported {len(summary.regenerated) + len(summary.skipped)} game(s): "
+        f"{len(summary.regenerated)} regenerated, {len(summary.skipped)} skipped."
+    )
 
 
 if __name__ == "__main__":
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
 import re
 import sys
-from dataclasses import dataclass
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, Protocol
 from urllib.parse import unquote
 
 GAMES_DIR = Path("docs/games")
 GAMES_INDEX_PATH = GAMES_DIR / "index.md"
 GAMES_PAGES_PATH = GAMES_DIR / ".pages"
-
-TAB_PATTERN = re.compile(r'^===\s+"([^"]+)"\s*$', re.MULTILINE)
-TITLE_PATTERN = re.compile(r"^#\s+.+\s+サマリー\s*$", re.MULTILINE)
-ACTION_BLOCK_PATTERN = re.compile(r'<div class="actions">(?P<body>.*?)</div>', re.DOTALL)
+CACHE_PATH = Path(".cache/validate-structure.json")
+# ルールの判定内容を変えたら上げる。キャッシュ済みの結果がすべて無効になる。
+RULESET_VERSION = 1
+
+# タブ行（=== "名前"）とタイトル行（# ... サマリー）を1回の finditer で拾う。
+# 先頭を固定文字の改行にすると、re が各位置で ^ を試さず改行まで読み飛ばせる
+# （走査対象の先頭には "\n" を足す）。見出しもタブも1行の構文なので、空白は改行をまたがない
+# [^\S\n] にし、タブ名にも改行を含めない（次の行に続くタイトルやタブ名は一致させない）。
+STRUCTURE_LINE_PATTERN = re.compile(
+    r'\n(?:===[^\S\n]+"(?P<tab>[^"\n]+)"[^\S\n]*|#[^\S\n]+.+[^\S\n]+サマリー[^\S\n]*)(?=\n|\Z)'
+)
+ACTION_BLOCK_OPEN = '<div class="actions">'
+ACTION_BLOCK_CLOSE = "</div>"
 DOWNLOAD_MACRO_PATTERN = re.compile(r'{{\s*download_link\("(?P<filename>[^"]+)"\)\s*}}')
 DOWNLOAD_HREF_PATTERN = re.compile(r'href\s*=\s*"(?P<href>[^"]+)"')
 GAMES_INDEX_ACTION_PATTERN = re.compile(
@@ -49,10 +65,21 @@ class ValidationIssue:
         return f"[{self.level}] {self.path.as_posix()}: {self.message}"
 
 
+@dataclass(frozen=True)
+class FileTiming:
+    path: Path
+    seconds: float
+    cached: bool
+
+    def to_json(self) -> dict:
+        return {"path": self.path.as_posix(), "seconds": self.seconds, "cached": self.cached}
+
+
 @dataclass
 class ValidationSummary:
     errors: list[ValidationIssue]
     warnings: list[ValidationIssue]
+    timings: list[FileTiming] = field(default_factory=list)
 
     def has_errors(self) -> bool:
         return bool(self.errors)
@@ -62,10 +89,6 @@ def _collect_game_files(games_dir: Path) -> list[Path]:
     return sorted(path for path in games_dir.glob("*.md") if path.stem != "index")
 
 
-def _extract_tabs(content: str) -> list[str]:
-    return [match.group(1) for match in TAB_PATTERN.finditer(content)]
-
-
 def _normalize_href_to_stem(href: str) -> str:
     decoded = unquote(href).strip()
     if decoded.endswith("/"):
@@ -73,6 +96,18 @@ def _normalize_href_to_stem(href: str) -> str:
     return Path(decoded).name
 
 
+def _iter_matches_with_line(
+    pattern: re.Pattern[str], content: str
+) -> Iterator[tuple[re.Match[str], int]]:
+    # finditer は出現順なので、直前のマッチからの改行数を足していけば全体で線形に行番号が出る。
+    line = 1
+    position = 0
+    for match in pattern.finditer(content):
+        line += content.count("\n", position, match.start())
+        position = match.start()
+        yield match, line
+
+
 def _extract_pages_nav_entries(content: str) -> list[str]:
     entries: list[str] = []
     in_nav = False
@@ -93,129 +128,185 @@ def _extract_pages_nav_entries(content: str) -> list[str]:
     return entries
 
 
-def validate_game_file(path: Path) -> ValidationSummary:
-    errors: list[ValidationIssue] = []
-    warnings: list[ValidationIssue] = []
+@dataclass
+class GameFileScan:
+    """1回の走査で集めたゲームファイルの構造情報。"""
+
+    has_title: bool = False
+    action_body: str | None = None
+    download_filename: str | None = None
+    download_href: str | None = None
+    tabs: list[str] = field(default_factory=list)
+
+
+def scan_game_content(content: str) -> GameFileScan:
+    scan = GameFileScan()
+    # actions ブロックは最初の開始タグから、その後の最初の閉じタグまで。
+    start = content.find(ACTION_BLOCK_OPEN)
+    if start >= 0:
+        start += len(ACTION_BLOCK_OPEN)
+        close = content.find(ACTION_BLOCK_CLOSE, start)
+        if close >= 0:
+            scan.action_body = content[start:close]
+
+    for match in STRUCTURE_LINE_PATTERN.finditer("\n" + content):
+        tab = match.group("tab")
+        if tab is not None:
+            scan.tabs.append(tab)
+        else:
+            scan.has_title = True
 
-    content = path.read_text(encoding="utf-8")
-    if not TITLE_PATTERN.search(content):
-        errors.append(
-            ValidationIssue(
+    if scan.action_body is not None:
+        macro_match = DOWNLOAD_MACRO_PATTERN.search(scan.action_body)
+        if macro_match:
+            scan.download_filename = macro_match.group("filename")
+        else:
+            href_match = DOWNLOAD_HREF_PATTERN.search(scan.action_body)
+            if href_match:
+                scan.download_href = href_match.group("href")
+    return scan
+
+
+class Rule(Protocol):
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]: ...
+
+
+class TitleRule:
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]:
+        if not scan.has_title:
+            yield ValidationIssue(
                 path=path,
                 level="ERROR",
                 message='タイトル `# <ゲーム名> サマリー` が見つかりません。',
             )
-        )
 
-    action_match = ACTION_BLOCK_PATTERN.search(content)
-    if not action_match:
-        errors.append(
-            ValidationIssue(
+
+class ActionsBlockRule:
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]:
+        if scan.action_body is None:
+            yield ValidationIssue(
                 path=path,
                 level="ERROR",
                 message='`<div class="actions">...</div>` ブロックが見つかりません。',
             )
-        )
-    else:
-        action_body = action_match.group("body")
-        if "{{ print_button() }}" not in action_body:
-            errors.append(
-                ValidationIssue(
+            return
+
+        if "{{ print_button() }}" not in scan.action_body:
+            yield ValidationIssue(
+                path=path,
+                level="ERROR",
+                message="actionsブロック内に `print_button()` がありません。",
+            )
+
+        expected_filename = f"{path.stem}.txt"
+        if scan.download_filename is not None:
+            if scan.download_filename != expected_filename:
+                yield ValidationIssue(
                     path=path,
                     level="ERROR",
-                    message="actionsブロック内に `print_button()` がありません。",
+                    message=(
+                        f"download_linkのファイル名が不一致です。"
+                        f" expected=`{expected_filename}`, actual=`{scan.download_filename}`"
+                    ),
                 )
+            return
+
+        expected_href = f"../../assets/{expected_filename}"
+        if scan.download_href is None:
+            yield ValidationIssue(
+                path=path,
+                level="ERROR",
+                message="actionsブロック内に download_link またはダウンロードhrefがありません。",
+            )
+        elif scan.download_href != expected_href:
+            yield ValidationIssue(
+                path=path,
+                level="ERROR",
+                message=(
+                    f"テキストDLリンクが不一致です。"
+                    f" expected=`{expected_href}`, actual=`{scan.download_href}`"
+                ),
             )
 
-        expected_filename = f"{path.stem}.txt"
-        macro_match = DOWNLOAD_MACRO_PATTERN.search(action_body)
-        if macro_match:
-            actual_filename = macro_match.group("filename")
-            if actual_filename != expected_filename:
-                errors.append(
-                    ValidationIssue(
-                        path=path,
-                        level="ERROR",
-                        message=(
-                            f"download_linkのファイル名が不一致です。"
-                            f" expected=`{expected_filename}`, actual=`{actual_filename}`"
-                        ),
-                    )
-                )
-        else:
-            href_match = DOWNLOAD_HREF_PATTERN.search(action_body)
-            expected_href = f"../../assets/{expected_filename}"
-            if not href_match:
-                errors.append(
-                    ValidationIssue(
-                        path=path,
-                        level="ERROR",
-                        message="actionsブロック内に download_link またはダウンロードhrefがありません。",
-                    )
+
+class RequiredTabsRule:
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]:
+        tab_set = set(scan.tabs)
+        for tab_name in ("SR", "OR"):
+            if tab_name not in tab_set:
+                yield ValidationIssue(
+                    path=path, level="ERROR", message=f'`=== "{tab_name}"` タブがありません。'
                 )
-            else:
-                actual_href = href_match.group("href")
-                if actual_href != expected_href:
-                    errors.append(
-                        ValidationIssue(
-                            path=path,
-                            level="ERROR",
-                            message=(
-                                f"テキストDLリンクが不一致です。"
-                                f" expected=`{expected_href}`, actual=`{actual_href}`"
-                            ),
-                        )
-                    )
-
-    tabs = _extract_tabs(content)
-    tab_set = set(tabs)
-    if "SR" not in tab_set:
-        errors.append(
-            ValidationIssue(path=path, level="ERROR", message='`=== "SR"` タブがありません。')
-        )
-    if "OR" not in tab_set:
-        errors.append(
-            ValidationIssue(path=path, level="ERROR", message='`=== "OR"` タブがありません。')
-        )
 
-    has_standard_setup = "セットアップ / 早見" in tab_set
-    has_split_setup = "会社の種類 / 準備" in tab_set and "早見表" in tab_set
-    has_legacy_setup = "その他" in tab_set
-    if not (has_standard_setup or has_split_setup):
+
+class SetupTabRule:
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]:
+        tab_set = set(scan.tabs)
+        has_standard_setup = "セットアップ / 早見" in tab_set
+        has_split_setup = "会社の種類 / 準備" in tab_set and "早見表" in tab_set
+        has_legacy_setup = "その他" in tab_set
+        if has_standard_setup or has_split_setup:
+            return
         if has_legacy_setup and path.stem in LEGACY_SETUP_ALLOWED_STEMS:
-            pass
-        elif has_legacy_setup:
-            warnings.append(
-                ValidationIssue(
-                    path=path,
-                    level="WARN",
-                    message=(
-                        "セットアップ枠が標準形式ではありません。"
-                        '`"セットアップ / 早見"` または `"会社の種類 / 準備"+"早見表"` の利用を推奨します。'
-                    ),
-                )
+            return
+        if has_legacy_setup:
+            yield ValidationIssue(
+                path=path,
+                level="WARN",
+                message=(
+                    "セットアップ枠が標準形式ではありません。"
+                    '`"セットアップ / 早見"` または `"会社の種類 / 準備"+"早見表"` の利用を推奨します。'
+                ),
             )
         else:
-            errors.append(
-                ValidationIssue(
-                    path=path,
-                    level="ERROR",
-                    message=(
-                        "セットアップ枠タブがありません。"
-                        ' `"セットアップ / 早見"` または `"会社の種類 / 準備"+"早見表"` が必要です。'
-                    ),
-                )
+            yield ValidationIssue(
+                path=path,
+                level="ERROR",
+                message=(
+                    "セットアップ枠タブがありません。"
+                    ' `"セットアップ / 早見"` または `"会社の種類 / 準備"+"早見表"` が必要です。'
+                ),
             )
 
-    for tab_name in tabs:
-        if tab_name not in ALLOWED_TAB_NAMES:
-            warnings.append(
-                ValidationIssue(
+
+class TabNameRule:
+    def check(self, path: Path, scan: GameFileScan) -> Iterator[ValidationIssue]:
+        for tab_name in scan.tabs:
+            if tab_name not in ALLOWED_TAB_NAMES:
+                yield ValidationIssue(
                     path=path,
                     level="WARN",
                     message=f"未登録のタブ名です: `{tab_name}`",
                 )
-            )
+
+
+# ルールを追加するときはここに並べる。走査は scan_game_content() の1回だけで済む。
+DEFAULT_RULES: tuple[Rule, ...] = (
+    TitleRule(),
+    ActionsBlockRule(),
+    RequiredTabsRule(),
+    SetupTabRule(),
+    TabNameRule(),
+)
+
+
+def validate_game_file(path: Path, rules: Iterable[Rule] = DEFAULT_RULES) -> ValidationSummary:
+    return validate_game_content(path, path.read_text(encoding="utf-8"), rules)
+
+
+def validate_game_content(
+    path: Path, content: str, rules: Iterable[Rule] = DEFAULT_RULES
+) -> ValidationSummary:
+    errors: list[ValidationIssue] = []
+    warnings: list[ValidationIssue] = []
+
+    scan = scan_game_content(content)
+    for rule in rules:
+        for issue in rule.check(path, scan):
+            if issue.level == "ERROR":
+                errors.append(issue)
+            else:
+                warnings.append(issue)
 
     return ValidationSummary(errors=errors, warnings=warnings)
 
@@ -252,15 +343,11 @@ def validate_pages_alignment(
         )
 
     index_content = index_path.read_text(encoding="utf-8")
-    index_entries = [
-        _normalize_href_to_stem(match.group("href"))
-        for match in GAMES_INDEX_ACTION_PATTERN.finditer(index_content)
-    ]
-    index_entries.extend(
-        _normalize_href_to_stem(match.group("href"))
-        for match in GAMES_INDEX_CARD_PATTERN.finditer(index_content)
-    )
-    index_set = {f"{name}.md" for name in index_entries if name}
+    entry_lines: defaultdict[str, list[int]] = defaultdict(list)
+    for pattern in (GAMES_INDEX_ACTION_PATTERN, GAMES_INDEX_CARD_PATTERN):
+        for match, line in _iter_matches_with_line(pattern, index_content):
+            entry_lines[_normalize_href_to_stem(match.group("href"))].append(line)
+    index_set = {f"{name}.md" for name in entry_lines if name}
 
     missing_in_index = sorted(stems - index_set)
     extra_in_index = sorted(index_set - stems)
@@ -281,9 +368,11 @@ def validate_pages_alignment(
             )
         )
 
-    duplicate_entries = sorted(
-        {entry for entry in index_entries if index_entries.count(entry) > 1}
-    )
+    duplicate_entries = [
+        f"{name} (行 {', '.join(str(line) for line in sorted(lines))})"
+        for name, lines in sorted(entry_lines.items())
+        if len(lines) > 1
+    ]
     if duplicate_entries:
         warnings.append(
             ValidationIssue(
@@ -296,28 +385,145 @@ def validate_pages_alignment(
     return ValidationSummary(errors=errors, warnings=warnings)
 
 
+def ruleset_fingerprint(rules: Iterable[Rule] = DEFAULT_RULES) -> str:
+    payload = {
+        "version": RULESET_VERSION,
+        "rules": [type(rule).__name__ for rule in rules],
+        "allowed_tabs": sorted(ALLOWED_TAB_NAMES),
+        "legacy_setup_stems": sorted(LEGACY_SETUP_ALLOWED_STEMS),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _load_cache(cache_path: Path, fingerprint: str) -> dict[str, dict]:
+    try:
+        payload = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("ruleset") != fingerprint:
+        return {}
+    files = payload.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def _write_cache(cache_path: Path, fingerprint: str, files: dict[str, dict]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with cache_path.open("w", encoding="utf-8", newline="\n") as handle:
+        json.dump({"ruleset": fingerprint, "files": files}, handle, ensure_ascii=False, sort_keys=True)
+        handle.write("\n")
+
+
+def _validate_timed(path: Path, content: str) -> tuple[list[list[str]], float]:
+    # ProcessPoolExecutor から呼ぶのでモジュール直下に置き、結果は pickle しやすい形で返す。
+    start = time.perf_counter()
+    result = validate_game_content(path, content)
+    issues = [[issue.level, issue.message] for issue in (*result.errors, *result.warnings)]
+    return issues, time.perf_counter() - start
+
+
 def run_validation(
     games_dir: Path = GAMES_DIR,
     pages_path: Path = GAMES_PAGES_PATH,
     index_path: Path = GAMES_INDEX_PATH,
+    jobs: int = 1,
+    cache_path: Path | None = None,
 ) -> ValidationSummary:
     game_files = _collect_game_files(games_dir)
     errors: list[ValidationIssue] = []
     warnings: list[ValidationIssue] = []
+    timings: list[FileTiming] = []
+
+    fingerprint = ruleset_fingerprint()
+    cached = _load_cache(cache_path, fingerprint) if cache_path is not None else {}
+    fresh_cache: dict[str, dict] = {}
+    file_issues: dict[Path, list[list[str]]] = {}
+    pending: list[tuple[Path, str, str]] = []
+
+    for game_path in game_files:
+        start = time.perf_counter()
+        content = game_path.read_text(encoding="utf-8")
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        key = game_path.as_posix()
+        entry = cached.get(key)
+        if isinstance(entry, dict) and entry.get("sha256") == digest:
+            file_issues[game_path] = entry["issues"]
+            fresh_cache[key] = entry
+            timings.append(FileTiming(game_path, time.perf_counter() - start, cached=True))
+        else:
+            pending.append((game_path, content, digest))
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+            results = list(
+                executor.map(
+                    _validate_timed,
+                    [path for path, _, _ in pending],
+                    [content for _, content, _ in pending],
+                    chunksize=max(1, len(pending) // (jobs * 4)),
+                )
+            )
+    else:
+        results = [_validate_timed(path, content) for path, content, _ in pending]
+
+    for (game_path, _, digest), (issues, seconds) in zip(pending, results):
+        file_issues[game_path] = issues
+        fresh_cache[game_path.as_posix()] = {"sha256": digest, "issues": issues}
+        timings.append(FileTiming(game_path, seconds, cached=False))
 
     for game_path in game_files:
-        result = validate_game_file(game_path)
-        errors.extend(result.errors)
-        warnings.extend(result.warnings)
+        for level, message in file_issues[game_path]:
+            issue = ValidationIssue(path=game_path, level=level, message=message)
+            if level == "ERROR":
+                errors.append(issue)
+            else:
+                warnings.append(issue)
+
+    if cache_path is not None and fresh_cache != cached:
+        _write_cache(cache_path, fingerprint, fresh_cache)
 
     alignment = validate_pages_alignment(game_files, pages_path, index_path)
     errors.extend(alignment.errors)
     warnings.extend(alignment.warnings)
-    return ValidationSummary(errors=errors, warnings=warnings)
+    timings.sort(key=lambda timing: timing.path)
+    return ValidationSummary(errors=errors, warnings=warnings, timings=timings)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Validate the structure of docs/games pages and the game list.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (0 = CPU count, 1 = validate in-process).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Ignore and do not update the results cache ({CACHE_PATH.as_posix()}).",
+    )
+    parser.add_argument(
+        "--timings",
+        type=Path,
+        help="Write per-file validation timings as JSON to this path.",
+    )
+    args = parser.parse_args(argv)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    start = time.perf_counter()
+    summary = run_validation(jobs=jobs, cache_path=None if args.no_cache else CACHE_PATH)
+    elapsed = time.perf_counter() - start
 
+    if args.timings:
+        args.timings.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "total_seconds": elapsed,
+            "files": [timing.to_json() for timing in summary.timings],
+        }
+        args.timings.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
 
-def main() -> int:
-    summary = run_validation()
     for issue in summary.errors:
         print(issue.format())
     for issue in summary.warnings:
@@ -0,0 +1,69 @@
+"""Tests for the synthetic catalogue and regression check used by benchmarks/."""
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.catalogue import write_catalogue
+from benchmarks.run import find_regressions, run_suite
+from scripts.validate_structure import run_validation
+
+
+class CatalogueTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.catalogue = write_catalogue(Path(self._tmp.name), 12)
+
+    def test_catalogue_passes_structure_validation(self):
+        summary = run_validation(
+            games_dir=self.catalogue.games_dir,
+            pages_path=self.catalogue.pages_path,
+            index_path=self.catalogue.index_path,
+        )
+        self.assertEqual(summary.errors, [])
+        self.assertEqual(summary.warnings, [])
+        self.assertEqual(len(self.catalogue.page_paths()), 12)
+
+    def test_meta_matches_pages_and_covers(self):
+        meta = json.loads(self.catalogue.meta_path.read_text(encoding="utf-8"))
+        bgg_ids = [card[0] for card in self.catalogue.cards]
+        # 10 件に 1 件はメタ情報なし。
+        self.assertEqual(sorted(meta), sorted(bgg_ids[:9] + bgg_ids[10:]))
+        for entry in meta.values():
+            cover = entry.get("cover")
+            if cover is None:
+                continue
+            for variant in cover.get("variants", ()):
+                self.assertTrue((self.catalogue.root / "docs" / variant["path"]).exists())
+            self.assertTrue((self.catalogue.root / "docs" / cover["path"]).exists())
+
+    def test_pages_carry_bgg_id_frontmatter(self):
+        first = self.catalogue.page_paths()[0].read_text(encoding="utf-8")
+        self.assertTrue(first.startswith(f"---\nbgg_id: {self.catalogue.cards[0][0]}\n---\n"))
+        self.assertIn('{{ download_link("18Bench00000.txt") }}', first)
+        self.assertNotIn("[ゲーム名]", first)
+
+
+class RegressionCheckTests(unittest.TestCase):
+    def test_flags_only_cases_beyond_threshold(self):
+        baseline = {"macros/100": {"seconds": 1.0}, "indent_tabs/100": {"seconds": 1.0}}
+        results = {
+            "macros/100": {"seconds": 1.2},
+            "indent_tabs/100": {"seconds": 1.3},
+            "export_text/100": {"seconds": 9.0},
+        }
+        regressions = find_regressions(results, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("indent_tabs/100"))
+
+    def test_run_suite_times_every_case(self):
+        results = run_suite([5], ["indent_tabs", "validate_structure", "macros"], repeat=1)
+        self.assertEqual(sorted(results), ["indent_tabs/5", "macros/5", "validate_structure/5"])
+        self.assertTrue(all(result["seconds"] > 0 for result in results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
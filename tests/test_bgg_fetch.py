@@ -0,0 +1,683 @@
+"""Tests for scripts/bgg_fetch.py against a local stub BGG server."""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, features
+
+from scripts import bgg_fetch
+
+
+def _png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _item_xml(bgg_id: str) -> str:
+    return (
+        f'<item type="boardgame" id="{bgg_id}">'
+        f'<name type="primary" value="Game {bgg_id}"/>'
+        '<minplayers value="3"/><maxplayers value="5"/>'
+        '<minplaytime value="120"/><maxplaytime value="240"/>'
+        '<yearpublished value="2020"/><minage value="12"/>'
+        '<link type="boardgamedesigner" value="Designer"/>'
+        "</item>"
+    )
+
+
+class StubBGGServer:
+    """Minimal /xmlapi2/thing stub. Replace respond() per test to script replies."""
+
+    def __init__(self) -> None:
+        self.requests: list[str] = []
+        self.images: dict[str, bytes] = {}
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive を有効にして、接続の使い回しを確かめられるようにする。
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    extra_headers: dict[str, str] = {}
+                    if self.path in stub.images:
+                        etag = f'"{len(stub.images[self.path])}-{hash(stub.images[self.path])}"'
+                        extra_headers["ETag"] = etag
+                        if self.headers.get("If-None-Match") == etag:
+                            status, payload, content_type = 304, b"", "image/png"
+                        else:
+                            status, payload, content_type = 200, stub.images[self.path], "image/png"
+                    else:
+                        status, body, *headers = stub.respond(self.path)
+                        payload, content_type = body.encode("utf-8"), "application/xml"
+                        if headers:
+                            extra_headers.update(headers[0])
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    for name, value in extra_headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                return
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/xmlapi2/thing"
+
+    def respond(self, path: str) -> tuple:
+        """(status, body) または (status, body, headers) を返す。"""
+        query = parse_qs(urlparse(path).query)
+        if "id" not in query:
+            return 404, "<error>not found</error>"
+        ids = query["id"][0].split(",")
+        return 200, f'<items>{"".join(_item_xml(bgg_id) for bgg_id in ids)}</items>'
+
+    def __enter__(self) -> StubBGGServer:
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _ids_of(path: str) -> list[str]:
+    return parse_qs(urlparse(path).query)["id"][0].split(",")
+
+
+class StubServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stub = StubBGGServer().__enter__()
+        self.pool = bgg_fetch.ConnectionPool()
+        self._patchers = [
+            patch.object(bgg_fetch, "API_URL", self.stub.url),
+            patch.object(bgg_fetch, "_http_pool", self.pool),
+            patch.object(bgg_fetch, "RETRY_BACKOFF_SECONDS", 0.01),
+            patch.dict(os.environ, {"BGG_TOKEN": "test-token"}),
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self._patchers:
+            patcher.stop()
+        self.pool.close()
+        self.stub.__exit__()
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_acquire_is_paced_after_burst(self) -> None:
+        bucket = bgg_fetch.TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.055)
+
+    def test_rejects_non_positive_rate(self) -> None:
+        with self.assertRaises(ValueError):
+            bgg_fetch.TokenBucket(rate=0)
+
+
+class SelectIdsToFetchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = datetime(2026, 3, 10, tzinfo=timezone.utc)
+        self.previous = {
+            "1": {"fetched_at": "2026-03-09T00:00:00Z"},
+            "2": {"fetched_at": "2026-02-01T00:00:00Z"},
+            "3": {"name": "no timestamp"},
+        }
+        self.ids = ["1", "2", "3", "4"]
+
+    def test_default_fetches_everything(self) -> None:
+        self.assertEqual(bgg_fetch.select_ids_to_fetch(self.ids, self.previous, self.now), self.ids)
+
+    def test_only_new_fetches_missing_ids(self) -> None:
+        self.assertEqual(
+            bgg_fetch.select_ids_to_fetch(self.ids, self.previous, self.now, only_new=True),
+            ["4"],
+        )
+
+    def test_stale_after_fetches_missing_stale_and_untimestamped(self) -> None:
+        self.assertEqual(
+            bgg_fetch.select_ids_to_fetch(
+                self.ids, self.previous, self.now, stale_after=timedelta(days=7)
+            ),
+            ["2", "3", "4"],
+        )
+
+
+class WriteJsonIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        self.root = Path(self.td.name)
+        self.payload = {
+            "20": {"name": "Caf\u00e9 \"20\"", "designers": [], "cover": {"variants": [{"width": 1}]}},
+            "3": {"name": "Three", "players": {"min": 2, "max": 4}},
+            "100": {},
+        }
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def test_json_is_identical_with_and_without_index(self) -> None:
+        bgg_fetch.write_json(self.root / "plain.json", self.payload)
+        bgg_fetch.write_json(self.root / "indexed.json", self.payload, self.root / "indexed.idx")
+        self.assertEqual(
+            (self.root / "plain.json").read_bytes(), (self.root / "indexed.json").read_bytes()
+        )
+
+    def test_index_records_point_at_values(self) -> None:
+        bgg_fetch.write_json(self.root / "m.json", self.payload, self.root / "m.idx")
+        text = (self.root / "m.json").read_bytes()
+        index = (self.root / "m.idx").read_bytes()
+        magic, size, count = bgg_fetch.META_INDEX_HEADER.unpack_from(index)
+        self.assertEqual((magic, size, count), (bgg_fetch.META_INDEX_MAGIC, len(text), 3))
+        records = [
+            bgg_fetch.META_INDEX_RECORD.unpack_from(index, bgg_fetch.META_INDEX_HEADER.size + i * 20)
+            for i in range(count)
+        ]
+        self.assertEqual([key for key, _, _ in records], [3, 20, 100])
+        for key, offset, length in records:
+            self.assertEqual(json.loads(text[offset : offset + length]), self.payload[str(key)])
+
+    def test_non_numeric_ids_skip_the_index(self) -> None:
+        (self.root / "m.idx").write_bytes(b"stale")
+        with patch("builtins.print"):
+            bgg_fetch.write_json(self.root / "m.json", {"abc": {}}, self.root / "m.idx")
+        self.assertFalse((self.root / "m.idx").exists())
+
+
+class ShardedLayoutTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        self.root = Path(self.td.name) / "bgg-meta"
+        self.payload = {str(bgg_id): {"name": f"Game {bgg_id}"} for bgg_id in range(1, 101)}
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def test_round_trip(self) -> None:
+        bgg_fetch.write_sharded(self.root, self.payload)
+        self.assertEqual(bgg_fetch.load_previous_sharded(self.root), self.payload)
+        index = json.loads((self.root / "index.json").read_text(encoding="utf-8"))
+        self.assertIn("42", index["shards"][bgg_fetch._shard_name("42")])
+
+    def test_only_changed_shards_are_rewritten(self) -> None:
+        first = bgg_fetch.write_sharded(self.root, self.payload)
+        self.assertEqual(len(first), len(list(self.root.glob("*.json"))))
+
+        self.assertEqual(bgg_fetch.write_sharded(self.root, self.payload), [])
+
+        self.payload["42"] = {"name": "Renamed"}
+        shard = self.root / f"{bgg_fetch._shard_name('42')}.json"
+        self.assertEqual(bgg_fetch.write_sharded(self.root, self.payload), [shard])
+
+    def test_emptied_shard_is_removed_and_index_updated(self) -> None:
+        bgg_fetch.write_sharded(self.root, {"1": {}, "2": {}})
+        shard = self.root / f"{bgg_fetch._shard_name('2')}.json"
+        self.assertNotEqual(bgg_fetch._shard_name("1"), bgg_fetch._shard_name("2"))
+
+        changed = bgg_fetch.write_sharded(self.root, {"1": {}})
+        self.assertEqual(changed, [shard, self.root / "index.json"])
+        self.assertFalse(shard.exists())
+
+
+class IterGameMetaTests(unittest.TestCase):
+    def test_yields_items_before_stream_is_exhausted(self) -> None:
+        body = f'<items>{_item_xml("1")}{"<!-- pad -->" * 4096}{_item_xml("2")}</items>'
+        stream = io.BytesIO(body.encode("utf-8"))
+        items = bgg_fetch.iter_game_meta(stream)
+
+        bgg_id, meta = next(items)
+        self.assertEqual((bgg_id, meta.name), ("1", "Game 1"))
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+        self.assertEqual([bgg_id for bgg_id, _ in items], ["2"])
+
+    def test_matches_parse_xml(self) -> None:
+        body = f"<items>{_item_xml('7')}<item/>{_item_xml('8')}</items>"
+        streamed = dict(bgg_fetch.iter_game_meta(io.BytesIO(body.encode("utf-8"))))
+        self.assertEqual(streamed, bgg_fetch.parse_xml(body))
+        self.assertEqual(set(streamed), {"7", "8"})
+
+    def test_message_root_raises_queued(self) -> None:
+        body = b"<message>Your request for this collection has been accepted</message>"
+        with self.assertRaises(bgg_fetch.QueuedResponseError):
+            list(bgg_fetch.iter_game_meta(io.BytesIO(body)))
+
+
+class BackoffTests(unittest.TestCase):
+    def test_delay_is_jittered_and_grows_exponentially(self) -> None:
+        with patch.object(bgg_fetch, "RETRY_BACKOFF_SECONDS", 4):
+            delays = [bgg_fetch._backoff_delay(3) for _ in range(50)]
+        self.assertTrue(all(8 <= delay <= 16 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_retry_after_is_a_lower_bound(self) -> None:
+        with patch.object(bgg_fetch, "RETRY_BACKOFF_SECONDS", 0.01):
+            self.assertGreaterEqual(bgg_fetch._backoff_delay(1, retry_after=7), 7)
+
+    def test_retry_after_parses_seconds_and_http_date(self) -> None:
+        self.assertEqual(bgg_fetch._retry_after_seconds("3"), 3.0)
+        self.assertEqual(bgg_fetch._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(bgg_fetch._retry_after_seconds("soon"))
+
+
+class ChunkSizerTests(unittest.TestCase):
+    def test_grows_on_fast_replies_and_halves_on_slow_or_throttled(self) -> None:
+        sizer = bgg_fetch.ChunkSizer(initial=8, maximum=10, target_seconds=1.0)
+        sizer.record_success(0.1)
+        sizer.record_success(0.1)
+        self.assertEqual(sizer.size, 10)
+        sizer.record_success(0.1)
+        self.assertEqual(sizer.size, 10)
+        sizer.record_success(5.0)
+        self.assertEqual(sizer.size, 5)
+        sizer.record_throttled()
+        sizer.record_throttled()
+        sizer.record_throttled()
+        self.assertEqual(sizer.size, 1)
+
+
+class FetchChunksTests(StubServerTestCase):
+    def _fetch(self, ids: list[str], **kwargs) -> dict:
+        kwargs.setdefault("limiter", bgg_fetch.TokenBucket(rate=1000, capacity=4))
+        return {
+            tuple(chunk): value for chunk, value in bgg_fetch.fetch_chunks(ids, **kwargs)
+        }
+
+    def test_fetches_chunks_concurrently(self) -> None:
+        self.stub.delay = 0.2
+        sizer = bgg_fetch.ChunkSizer(initial=2, maximum=2)
+
+        start = time.monotonic()
+        results = self._fetch([str(number) for number in range(1, 9)], concurrency=4, sizer=sizer)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(results), 4)
+        self.assertGreater(self.stub.max_in_flight, 1)
+        self.assertLess(elapsed, 0.2 * 4)
+        parsed = results[("3", "4")]
+        self.assertEqual(parsed["4"].name, "Game 4")
+        self.assertEqual(parsed["4"].players_max, 5)
+
+    def test_failing_chunk_is_split_to_isolate_bad_id(self) -> None:
+        default = self.stub.respond
+
+        def respond(path: str) -> tuple:
+            if "13" in _ids_of(path):
+                return 400, "<error>bad id</error>"
+            return default(path)
+
+        self.stub.respond = respond
+        ids = [str(number) for number in range(10, 18)]
+        results = self._fetch(ids, concurrency=1, sizer=bgg_fetch.ChunkSizer(initial=8))
+
+        self.assertIsInstance(results.pop(("13",)), bgg_fetch.FetchError)
+        fetched = {bgg_id for parsed in results.values() for bgg_id in parsed}
+        self.assertEqual(fetched, set(ids) - {"13"})
+
+    def test_queued_reply_is_retried_after_retry_after(self) -> None:
+        default = self.stub.respond
+        queued: list[str] = []
+
+        def respond(path: str) -> tuple:
+            if not queued:
+                queued.append(path)
+                return 202, "", {"Retry-After": "0.3"}
+            return default(path)
+
+        self.stub.respond = respond
+        sizer = bgg_fetch.ChunkSizer(initial=4)
+        start = time.monotonic()
+        results = self._fetch(["1", "2", "3", "4"], concurrency=1, sizer=sizer)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(set(results[("1", "2", "3", "4")]), {"1", "2", "3", "4"})
+        self.assertEqual(len(self.stub.requests), 2)
+        # キュー待ちで半分に縮み、成功で1つ戻る。
+        self.assertEqual(sizer.size, 3)
+
+    def test_transient_failure_is_not_split_before_any_success(self) -> None:
+        self.stub.respond = lambda path: (503, "<error>busy</error>")
+        with patch.object(bgg_fetch, "RETRY_MAX", 2):
+            results = self._fetch(["1", "2", "3"], concurrency=1)
+
+        self.assertEqual(list(results), [("1", "2", "3")])
+        self.assertTrue(results[("1", "2", "3")].retryable)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_unauthorized_aborts_without_splitting(self) -> None:
+        self.stub.respond = lambda path: (401, "<error>unauthorized</error>")
+        self.stub.images["/images/big.png"] = _png_bytes(960, 1280)
+        ids = [str(number) for number in range(1, 41)]
+        with tempfile.TemporaryDirectory() as td:
+            covers_dir = Path(td) / "game-covers"
+            with self.assertRaises(bgg_fetch.AuthenticationError):
+                # main() と同じく、取得の中断は CoverPipeline の中で起きる。
+                with bgg_fetch.CoverPipeline(2, 1, covers_dir=covers_dir) as covers:
+                    covers.submit("1", f"{self.stub.base_url}/images/big.png", None)
+                    self.assertIsNotNone(covers.results()["1"])
+                    self._fetch(ids, concurrency=2, sizer=bgg_fetch.ChunkSizer(initial=20))
+            # 変換を終えていたカバーも、書き換えない bgg-meta.json と食い違わないよう捨てる。
+            self.assertEqual(list(covers_dir.rglob("*")), [])
+        api_requests = [path for path in self.stub.requests if path.startswith("/xmlapi2/")]
+        self.assertLessEqual(len(api_requests), 2)
+
+    def test_missing_token_aborts_before_any_request(self) -> None:
+        with patch.dict(os.environ, {"BGG_TOKEN": ""}):
+            with self.assertRaises(bgg_fetch.AuthenticationError):
+                self._fetch(["1", "2", "3"], concurrency=1)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_non_id_specific_failure_is_not_split(self) -> None:
+        default = self.stub.respond
+
+        def respond(path: str) -> tuple:
+            if "5" in _ids_of(path):
+                return 404, "<error>not found</error>"
+            return default(path)
+
+        self.stub.respond = respond
+        ids = [str(number) for number in range(1, 9)]
+        results = self._fetch(ids, concurrency=1, sizer=bgg_fetch.ChunkSizer(initial=4, maximum=4))
+
+        self.assertIsInstance(results[("5", "6", "7", "8")], bgg_fetch.FetchError)
+        self.assertEqual(len(self.stub.requests), 2)
+
+
+class ConnectionPoolTests(StubServerTestCase):
+    def test_sequential_requests_reuse_one_connection(self) -> None:
+        for chunk in (["1"], ["2"], ["3"]):
+            self.assertEqual(set(bgg_fetch.fetch_meta(chunk)), set(chunk))
+        self.stub.images["/images/a.png"] = _png_bytes(4, 4)
+        self.assertIsNotNone(bgg_fetch._load_image(f"{self.stub.base_url}/images/a.png"))
+
+        self.assertEqual(self.pool.requests_sent, 4)
+        self.assertEqual(self.pool.connections_opened, 1)
+
+    def test_error_response_keeps_connection_reusable(self) -> None:
+        with self.assertRaises(bgg_fetch.HttpError) as caught:
+            bgg_fetch._load_image(f"{self.stub.base_url}/missing.png")
+        self.assertEqual(caught.exception.code, 404)
+        bgg_fetch.fetch_meta(["1"])
+        self.assertEqual(self.pool.connections_opened, 1)
+
+    def test_follows_redirects(self) -> None:
+        default = self.stub.respond
+        self.stub.images["/images/new.png"] = _png_bytes(4, 4)
+
+        def respond(path: str) -> tuple:
+            if path == "/images/old.png":
+                return 301, "", {"Location": "/images/new.png"}
+            return default(path)
+
+        self.stub.respond = respond
+        response = bgg_fetch._load_image(f"{self.stub.base_url}/images/old.png")
+        self.assertEqual(response.body, self.stub.images["/images/new.png"])
+        self.assertEqual(self.pool.requests_sent, 2)
+
+    def test_idle_connection_closed_by_server_is_replaced(self) -> None:
+        bgg_fetch.fetch_meta(["1"])
+        for connections in self.pool._idle.values():
+            for connection in connections:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+
+        # fetch_meta の再試行に頼らず、プール自身が1回で送り直すこと。
+        with self.pool.open(f"{self.stub.url}?id=2") as response:
+            self.assertIn(b'id="2"', response.read())
+        self.assertEqual(self.pool.connections_opened, 2)
+
+
+class ResponseCacheTests(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.td = tempfile.TemporaryDirectory()
+        self.root = Path(self.td.name) / "bgg"
+        self.stub.images["/images/a.png"] = _png_bytes(8, 8)
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+        super().tearDown()
+
+    def _record(self) -> None:
+        cache = bgg_fetch.ResponseCache(self.root)
+        bgg_fetch.fetch_meta(["1", "2"], cache=cache)
+        bgg_fetch._load_image(f"{self.stub.base_url}/images/a.png", cache=cache)
+        cache.save()
+
+    def test_responses_are_stored_by_content_hash(self) -> None:
+        self._record()
+        blobs = sorted(path for path in (self.root / "blobs").rglob("*") if path.is_file())
+        self.assertEqual(len(blobs), 2)
+        for blob in blobs:
+            self.assertEqual(hashlib.sha256(blob.read_bytes()).hexdigest(), blob.name)
+        self.assertEqual(list(self.root.glob("blob-*")), [])
+
+    def test_offline_replays_without_network_or_token(self) -> None:
+        self._record()
+        requests = len(self.stub.requests)
+        cache = bgg_fetch.ResponseCache(self.root, offline=True)
+
+        with patch.dict(os.environ, {"BGG_TOKEN": ""}):
+            replayed = bgg_fetch.fetch_meta(["2", "3"], cache=cache)
+            image = bgg_fetch._load_image(f"{self.stub.base_url}/images/a.png", cache=cache)
+
+        self.assertEqual(set(replayed), {"2"})
+        self.assertEqual(replayed["2"].name, "Game 2")
+        self.assertIsNotNone(cache.fetched_at("2"))
+        self.assertEqual(image.body, self.stub.images["/images/a.png"])
+        self.assertEqual(len(self.stub.requests), requests)
+
+    def test_offline_missing_image_is_an_os_error(self) -> None:
+        cache = bgg_fetch.ResponseCache(self.root, offline=True)
+        with self.assertRaises(OSError):
+            bgg_fetch._load_image(f"{self.stub.base_url}/images/a.png", cache=cache)
+
+    def test_failed_response_leaves_no_blob(self) -> None:
+        self.stub.respond = lambda path: (200, "<items><item id='1'>")
+        cache = bgg_fetch.ResponseCache(self.root)
+        with self.assertRaises(bgg_fetch.FetchError):
+            bgg_fetch.fetch_meta(["1"], cache=cache)
+        self.assertEqual([path for path in self.root.rglob("*") if path.is_file()], [])
+
+
+class CoverPipelineTests(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.td = tempfile.TemporaryDirectory()
+        self.covers_dir = Path(self.td.name) / "game-covers"
+        self.stub.images["/images/big.png"] = _png_bytes(960, 1280)
+        self.stub.images["/images/thumb.png"] = _png_bytes(100, 150)
+        self.stub.images["/images/broken.png"] = b"not an image"
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+        super().tearDown()
+
+    def _run(self, encode_workers: int) -> tuple[dict, bgg_fetch.CoverPipeline]:
+        base = self.stub.base_url
+        with patch("builtins.print"):
+            with bgg_fetch.CoverPipeline(2, encode_workers, covers_dir=self.covers_dir) as covers:
+                covers.submit("1", f"{base}/images/big.png", None)
+                covers.submit("2", f"{base}/images/broken.png", f"{base}/images/thumb.png")
+                covers.submit("3", f"{base}/images/missing.png", None)
+                results = covers.results()
+        return results, covers
+
+    def test_downloads_and_encodes_with_fallback(self) -> None:
+        results, covers = self._run(encode_workers=1)
+        self.assertEqual(
+            {key: results["1"][key] for key in ("path", "width", "height", "source")},
+            {"path": "assets/game-covers/1.webp", "width": 480, "height": 640, "source": "image"},
+        )
+        self.assertEqual(results["1"]["source_url"], f"{self.stub.base_url}/images/big.png")
+        self.assertEqual(len(results["1"]["sha256"]), 64)
+        self.assertTrue(results["1"]["etag"].startswith('"'))
+        self.assertEqual(results["2"]["source"], "thumbnail")
+        self.assertEqual((results["2"]["width"], results["2"]["height"]), (100, 150))
+        self.assertIsNone(results["3"])
+        with Image.open(self.covers_dir / "1.webp") as image:
+            self.assertEqual(image.format, "WEBP")
+        self.assertEqual(covers.download_timing.count, 3)
+        self.assertEqual(covers.encode_timing.count, 2)
+
+    def test_process_pool_encoding_matches_in_process(self) -> None:
+        serial, _ = self._run(encode_workers=1)
+        serial_bytes = (self.covers_dir / "1.webp").read_bytes()
+        parallel, covers = self._run(encode_workers=2)
+        self.assertEqual(parallel, serial)
+        self.assertEqual((self.covers_dir / "1.webp").read_bytes(), serial_bytes)
+        self.assertIn("encode(s)", covers.report())
+
+    def test_download_threads_do_not_wait_for_encodes(self) -> None:
+        # ダウンロード1本でも、最初の変換が終わる前に次の画像の変換が始まる。
+        second_started = threading.Event()
+        encode = bgg_fetch._encode_cover
+
+        def encode_cover(raw, output_path, *args):
+            if output_path.stem == "1":
+                self.assertTrue(second_started.wait(5), "second encode never started")
+            else:
+                second_started.set()
+            return encode(raw, output_path, *args)
+
+        base = self.stub.base_url
+        with patch.object(bgg_fetch, "_encode_cover", encode_cover):
+            with bgg_fetch.CoverPipeline(1, 1, covers_dir=self.covers_dir) as covers:
+                covers._encoder = ThreadPoolExecutor(max_workers=2)
+                covers.submit("1", f"{base}/images/big.png", None)
+                covers.submit("2", f"{base}/images/thumb.png", None)
+                results = covers.results()
+
+        self.assertEqual(results["1"]["width"], 480)
+        self.assertEqual(results["2"]["width"], 100)
+
+    def test_variants_are_written_and_recorded(self) -> None:
+        results, _ = self._run(encode_workers=1)
+        self.assertEqual(
+            [(variant["path"], variant["width"], variant["height"]) for variant in results["1"]["variants"]],
+            [("assets/game-covers/1-160w.webp", 160, 213), ("assets/game-covers/1-320w.webp", 320, 427)],
+        )
+        self.assertEqual({variant["type"] for variant in results["1"]["variants"]}, {"image/webp"})
+        with Image.open(self.covers_dir / "1-160w.webp") as image:
+            self.assertEqual(image.size, (160, 213))
+        # 本体が縮小版の幅より小さければ縮小版は作らない。
+        self.assertNotIn("variants", results["2"])
+
+    def test_placeholder_is_recorded_and_backfilled(self) -> None:
+        first, _ = self._run(encode_workers=1)
+        placeholder = first["1"]["placeholder"]
+        self.assertEqual(placeholder["color"], "#c82828")
+        self.assertTrue(placeholder["image"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(placeholder["image"]), 200)
+
+        legacy = {key: value for key, value in first["1"].items() if key != "placeholder"}
+        cover, covers = self._refresh(legacy, legacy["source_url"])
+        self.assertEqual(covers.encode_timing.count, 0)
+        # 生成済みの（非可逆の）WebP から作るので、色は元画像とわずかにずれうる。
+        backfilled = bytes.fromhex(cover["placeholder"]["color"][1:])
+        for channel, expected in zip(backfilled, (200, 40, 40)):
+            self.assertAlmostEqual(channel, expected, delta=4)
+
+    def test_cover_missing_variants_is_reencoded(self) -> None:
+        first, _ = self._run(encode_workers=1)
+        legacy = {key: value for key, value in first["1"].items() if key != "variants"}
+        cover, covers = self._refresh(legacy, legacy["source_url"])
+        self.assertEqual(covers.encode_timing.count, 1)
+        self.assertEqual(cover, first["1"])
+
+    @unittest.skipUnless(features.check("avif"), "Pillow built without AVIF support")
+    def test_avif_variants_include_full_size(self) -> None:
+        with patch("builtins.print"):
+            with bgg_fetch.CoverPipeline(1, 1, covers_dir=self.covers_dir, avif=True) as covers:
+                covers.submit("1", f"{self.stub.base_url}/images/big.png", None)
+                cover = covers.results()["1"]
+        avif = [
+            (variant["width"], variant["path"])
+            for variant in cover["variants"]
+            if variant["type"] == "image/avif"
+        ]
+        self.assertEqual(
+            avif,
+            [
+                (160, "assets/game-covers/1-160w.avif"),
+                (320, "assets/game-covers/1-320w.avif"),
+                (480, "assets/game-covers/1.avif"),
+            ],
+        )
+        self.assertTrue((self.covers_dir / "1.avif").exists())
+
+    def _refresh(self, previous_cover: dict, url: str, revalidate: bool = False):
+        with patch("builtins.print"):
+            with bgg_fetch.CoverPipeline(
+                1, 1, covers_dir=self.covers_dir, revalidate=revalidate
+            ) as covers:
+                covers.submit("1", url, None, previous_cover)
+                results = covers.results()
+        return results["1"], covers
+
+    def test_unchanged_source_url_skips_download(self) -> None:
+        first, _ = self._run(encode_workers=1)
+        requests_before = len(self.stub.requests)
+        cover, covers = self._refresh(first["1"], first["1"]["source_url"])
+        self.assertEqual(cover, first["1"])
+        self.assertEqual(len(self.stub.requests), requests_before)
+        self.assertEqual(covers.unchanged, 1)
+
+    def test_revalidate_sends_conditional_request(self) -> None:
+        first, _ = self._run(encode_workers=1)
+        cover, covers = self._refresh(first["1"], first["1"]["source_url"], revalidate=True)
+        self.assertEqual(cover, first["1"])
+        self.assertEqual(covers.bytes_downloaded, 0)
+        self.assertEqual(covers.encode_timing.count, 0)
+
+    def test_same_content_at_new_url_is_not_reencoded(self) -> None:
+        first, _ = self._run(encode_workers=1)
+        self.stub.images["/images/moved.png"] = self.stub.images["/images/big.png"]
+        moved_url = f"{self.stub.base_url}/images/moved.png"
+        cover, covers = self._refresh(first["1"], moved_url)
+        self.assertEqual(covers.encode_timing.count, 0)
+        self.assertEqual(cover["source_url"], moved_url)
+        self.assertEqual(cover["sha256"], first["1"]["sha256"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from scripts import export_text
+from scripts.export_text import PlainTextExtractor, export_texts, markdown_to_text
+
+GAME_CONTENT = """# 18Test サマリー
+
+<div class="actions">
+  {{ print_button() }}
+</div>
+
+=== "SR"
+
+    - 株を買う
+"""
+
+
+def _write(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8", newline="\n")
+
+
+class MarkdownToTextTests(unittest.TestCase):
+    def test_matches_committed_text_assets(self) -> None:
+        root = Path(__file__).resolve().parent.parent
+        games = sorted(
+            path for path in (root / "docs" / "games").glob("*.md") if path.stem != "index"
+        )
+        for md_path in games:
+            with self.subTest(game=md_path.stem):
+                expected = (root / "docs" / "assets" / f"{md_path.stem}.txt").read_text(
+                    encoding="utf-8"
+                )
+                actual = markdown_to_text(md_path.read_text(encoding="utf-8"))
+                self.assertEqual(actual, expected)
+
+    def test_reused_converter_is_independent_of_document_order(self) -> None:
+        table_doc = "| a | b |\n|---|---|\n| 1 | 2 |\n"
+        tab_doc = '=== "SR"\n\n    - 株を買う\n\n=== "OR"\n\n    ```\n    code\n    ```\n'
+        first = [markdown_to_text(table_doc), markdown_to_text(tab_doc)]
+        converter = export_text._get_converter()
+        second = [markdown_to_text(tab_doc), markdown_to_text(table_doc)]
+        self.assertIs(export_text._get_converter(), converter)
+        self.assertEqual(first, second[::-1])
+        self.assertEqual(first[0], "a | b\n1 | 2\n")
+
+
+class PlainTextExtractorTests(unittest.TestCase):
+    def test_streams_normalized_lines_to_sink(self) -> None:
+        sink = io.StringIO()
+        parser = PlainTextExtractor(sink)
+        parser.feed("<p>  first  </p>\n\n\n<table><tr><td>a\n b</td><td>c</td></tr></table>")
+        self.assertEqual(sink.getvalue(), "first\na b | c")
+        parser.feed("<p>last</p>")
+        parser.finish()
+        self.assertEqual(sink.getvalue(), "first\na b | c\nlast\n")
+
+    def test_crlf_split_across_chunks_is_one_line_break(self) -> None:
+        parser = PlainTextExtractor()
+        parser.feed("<pre>a\r")
+        parser.feed("\nb</pre>")
+        self.assertEqual(parser.get_text(), "a\nb\n")
+
+    def test_empty_document_yields_single_newline(self) -> None:
+        parser = PlainTextExtractor()
+        parser.feed("<div> </div>")
+        self.assertEqual(parser.get_text(), "\n")
+
+
+class IncrementalExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        self.games = root / "games"
+        self.assets = root / "assets"
+        _write(self.games / "18Test.md", GAME_CONTENT)
+        _write(self.games / "index.md", "# ゲーム一覧\n")
+        self._patchers = [
+            patch.object(export_text, "GAMES_DIR", self.games),
+            patch.object(export_text, "ASSETS_DIR", self.assets),
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self._patchers:
+            patcher.stop()
+        self.td.cleanup()
+
+    def test_second_run_skips_unchanged_games(self) -> None:
+        with patch("builtins.print"):
+            first = export_texts()
+            second = export_texts()
+        self.assertEqual([path.name for path in first.regenerated], ["18Test.txt"])
+        self.assertEqual(second.regenerated, [])
+        self.assertEqual([path.name for path in second.skipped], ["18Test.txt"])
+        self.assertIn("・株を買う", (self.assets / "18Test.txt").read_text(encoding="utf-8"))
+
+    def test_changed_source_missing_output_and_force_regenerate(self) -> None:
+        with patch("builtins.print"):
+            export_texts()
+            _write(self.games / "18Test.md", GAME_CONTENT + "    - 株を売る\n")
+            changed = export_texts()
+            (self.assets / "18Test.txt").unlink()
+            missing = export_texts()
+            forced = export_texts(force=True)
+        self.assertEqual(len(changed.regenerated), 1)
+        self.assertEqual(len(missing.regenerated), 1)
+        self.assertEqual(len(forced.regenerated), 1)
+
+    def test_exporter_version_bump_invalidates_manifest(self) -> None:
+        with patch("builtins.print"):
+            export_texts()
+            with patch.object(export_text, "EXPORTER_VERSION", export_text.EXPORTER_VERSION + 1):
+                bumped = export_texts()
+        self.assertEqual(len(bumped.regenerated), 1)
+
+    def test_parallel_export_matches_in_process_export(self) -> None:
+        for index in range(4):
+            _write(self.games / f"18Extra{index}.md", GAME_CONTENT + f"    - 追加{index}\n")
+        with patch("builtins.print"):
+            serial = export_texts(force=True, jobs=1)
+            serial_texts = {
+                path.name: path.read_text(encoding="utf-8") for path in serial.regenerated
+            }
+            parallel = export_texts(force=True, jobs=3)
+        self.assertEqual(parallel.regenerated, serial.regenerated)
+        self.assertEqual(
+            {path.name: path.read_text(encoding="utf-8") for path in parallel.regenerated},
+            serial_texts,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
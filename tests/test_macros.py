@@ -8,16 +8,23 @@ from pathlib import Path
 from unittest.mock import patch
 
 
-def _load_env():
+def _load_env(
+    meta_path: Path | None = None, covers_dir: Path | None = None, conf: dict | None = None
+):
     """Import define_env and wire up a minimal env stub."""
     import importlib
     import main as main_module
 
     importlib.reload(main_module)
+    if meta_path is not None:
+        main_module.BGG_META_PATH = meta_path
+    if covers_dir is not None:
+        main_module.COVERS_DIR = covers_dir
 
     class _Env:
         def __init__(self):
             self.macros: dict = {}
+            self.conf = conf or {}
 
         def macro(self, fn):
             self.macros[fn.__name__] = fn
@@ -62,6 +69,31 @@ class DownloadLinkTests(unittest.TestCase):
         self.assertEqual(result, "")
 
 
+class IconCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.macros = _load_env()
+        import main as main_module
+
+        self.main = main_module
+
+    def test_prewarmed_icons_are_served_from_cache(self):
+        before = self.main._render_icon.cache_info()
+        self.assertGreaterEqual(before.currsize, len(self.main.PREWARM_ICONS))
+
+        self.macros["icon"]("material-train")
+        self.main._material_icon("material-calendar", "game-card__year-icon")
+
+        after = self.main._render_icon.cache_info()
+        self.assertEqual(after.misses, before.misses)
+        self.assertEqual(after.hits, before.hits + 2)
+
+    def test_cached_icon_matches_uncached_render(self):
+        cached = self.main._material_icon("material-draw", "game-card__detail-icon")
+        uncached = self.main._render_icon.__wrapped__("material-draw", "game-card__detail-icon")
+        self.assertEqual(cached, uncached)
+        self.assertIn("<svg", cached)
+
+
 class GameActionsCTATests(unittest.TestCase):
     def setUp(self):
         meta = {
@@ -98,5 +130,387 @@ class GameActionsCTATests(unittest.TestCase):
         self.assertNotIn("md-button", result)
 
 
+class GameFieldTableTests(unittest.TestCase):
+    def setUp(self):
+        meta = {
+            "999": {
+                "players": {"min": 2, "max": 4},
+                "year_published": 2021,
+                "designers": ["A & B", " ", 3],
+            },
+            "broken": "not a dict",
+        }
+        self.tmp = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".json", delete=False, encoding="utf-8"
+        )
+        json.dump(meta, self.tmp)
+        self.tmp.close()
+        self.macros = _load_env(Path(self.tmp.name))
+        import main as main_module
+
+        self.main = main_module
+
+    def tearDown(self):
+        Path(self.tmp.name).unlink(missing_ok=True)
+
+    def test_records_are_built_once_and_immutable(self):
+        fields = self.main._field_table.get("999")
+        self.assertEqual(fields.players_text, "2-4人")
+        self.assertEqual(fields.safe_designers, ("A &amp; B",))
+        with self.assertRaises(AttributeError):
+            fields.year = 2000
+        self.assertIsNone(self.main._field_table.get("broken"))
+
+    def test_game_card_lookups_are_counted(self):
+        self.macros["game_card"]("999", "T", "D", "", "T/")
+        self.macros["game_card"]("404", "T", "D", "", "T/")
+        stats = self.main.field_table_stats()
+        self.assertEqual(stats["records"], 1)
+        # game_card はカード1枚につき1回だけ引く。
+        self.assertEqual(stats["lookups"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+
+class GameCoverScanTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        covers = root / "game-covers"
+        covers.mkdir()
+        (covers / "1.webp").write_bytes(b"RIFF")
+        meta_path = root / "bgg-meta.json"
+        cover = {"width": 480, "height": 640, "source": "image"}
+        meta = {
+            "1": {"cover": {**cover, "path": "assets/game-covers/1.webp"}},
+            "2": {"cover": {**cover, "path": "assets/game-covers/2.webp"}},
+        }
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+        self.macros = _load_env(meta_path, covers)
+        import main as main_module
+
+        self.main = main_module
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_cover_present_in_scan_renders_image(self):
+        result = self.macros["game_cover"]("1", "Test")
+        self.assertIn('src="../assets/game-covers/1.webp"', result)
+        self.assertIn('width="480"', result)
+
+    def test_cover_missing_from_scan_renders_placeholder(self):
+        result = self.macros["game_cover"]("2", "Test")
+        self.assertIn("NO IMAGE", result)
+
+    def test_cover_without_variants_has_no_srcset(self):
+        result = self.macros["game_cover"]("1", "Test")
+        self.assertNotIn("srcset", result)
+        self.assertNotIn("<picture", result)
+
+    def test_scan_records_size_and_mtime(self):
+        covers = self.main._scan_covers()
+        self.assertEqual(set(covers), {"1.webp"})
+        self.assertEqual(covers["1.webp"].size, 4)
+        self.assertGreater(covers["1.webp"].mtime_ns, 0)
+
+
+class GameCoverMediaTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        covers = root / "game-covers"
+        covers.mkdir()
+        for name in ("1.webp", "1-160w.webp", "1-320w.webp", "1-160w.avif", "1.avif"):
+            (covers / name).write_bytes(b"RIFF")
+
+        def variant(name, width, mime):
+            return {"path": f"assets/game-covers/{name}", "width": width, "height": width, "type": mime}
+
+        meta = {
+            "1": {
+                "cover": {
+                    "path": "assets/game-covers/1.webp",
+                    "width": 480,
+                    "height": 640,
+                    "source": "image",
+                    "placeholder": {
+                        "color": "#a1b2c3",
+                        "image": "data:image/webp;base64,UklGRg==",
+                    },
+                    "variants": [
+                        variant("1-320w.webp", 320, "image/webp"),
+                        variant("1-160w.webp", 160, "image/webp"),
+                        variant("1-240w.webp", 240, "image/webp"),
+                        variant("1-160w.avif", 160, "image/avif"),
+                        variant("1.avif", 480, "image/avif"),
+                    ],
+                }
+            }
+        }
+        meta_path = root / "bgg-meta.json"
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        self.macros = _load_env(meta_path, covers)
+        import main as main_module
+
+        self.main = main_module
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_webp_variants_render_srcset_and_sizes(self):
+        result = self.macros["game_cover"]("1", "Test")
+        self.assertIn(
+            'srcset="../assets/game-covers/1-160w.webp 160w, '
+            "../assets/game-covers/1-320w.webp 320w, "
+            '../assets/game-covers/1.webp 480w" sizes="6.25rem"',
+            result,
+        )
+        # scan に無い縮小版（240w）は使わない。
+        self.assertNotIn("240w", result)
+
+    def test_avif_variants_render_picture_source(self):
+        result = self.macros["game_cover"]("1", "Test", "T/")
+        self.assertIn(
+            '<picture class="game-card__media-picture"><source type="image/avif" '
+            'srcset="../assets/game-covers/1-160w.avif 160w, ../assets/game-covers/1.avif 480w" '
+            'sizes="6.25rem"><img src="../assets/game-covers/1.webp" ',
+            result,
+        )
+        self.assertTrue(result.endswith("</picture></a></figure>"))
+
+    def test_placeholder_is_inlined_as_background(self):
+        result = self.macros["game_cover"]("1", "Test")
+        self.assertTrue(
+            result.startswith(
+                '<figure class="game-card__media game-card__media--lqip" '
+                'style="background-color:#a1b2c3;background-image:url(data:image/webp;base64,UklGRg==)">'
+            )
+        )
+
+    def test_malformed_placeholder_is_ignored(self):
+        fields = self.main._extract_meta_fields(
+            "1",
+            {
+                "cover": {
+                    "path": "assets/game-covers/1.webp",
+                    "width": 480,
+                    "height": 640,
+                    "placeholder": {"color": "red;x:y", "image": 'data:image/webp;base64,")'},
+                }
+            },
+            self.main._scan_covers(),
+        )
+        self.assertIsNone(fields.cover_placeholder_style)
+
+
+class MetaIndexTests(unittest.TestCase):
+    def setUp(self):
+        from scripts import bgg_fetch
+
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        self.meta_path = root / "bgg-meta.json"
+        self.meta = {
+            str(bgg_id): {
+                "players": {"min": 2, "max": bgg_id % 5 + 2},
+                "year_published": 2000 + bgg_id,
+            }
+            for bgg_id in range(1, 200)
+        }
+        bgg_fetch.write_json(self.meta_path, self.meta, self.meta_path.with_suffix(".idx"))
+        self.macros = _load_env(self.meta_path, root / "covers")
+        import main as main_module
+
+        self.main = main_module
+
+    def tearDown(self):
+        self.main._close_meta_source()
+        self.td.cleanup()
+
+    def test_index_resolves_only_referenced_ids(self):
+        result = self.macros["game_card"]("42", "T", "D", "", "T/")
+        self.assertIn('data-year="2042"', result)
+        self.assertIsNone(self.main._field_table.get("404"))
+        self.assertEqual(set(self.main._field_table._records), {"42", "404"})
+        self.assertIsInstance(self.main._field_table._lookup.__self__, self.main.BggMetaIndex)
+
+    def test_output_matches_json_backed_table(self):
+        ids = ("1", "77", "199", "200", "x")
+        indexed = [self.macros["game_card"](bgg_id, "T", "D", "", "T/") for bgg_id in ids]
+        self.meta_path.with_suffix(".idx").unlink()
+        plain_macros = _load_env(self.meta_path)
+        plain = [plain_macros["game_card"](bgg_id, "T", "D", "", "T/") for bgg_id in ids]
+        self.assertEqual(indexed, plain)
+
+    def test_stale_index_falls_back_to_json(self):
+        # バイト数は変えずに、"10" 以降の値の位置を1文字ずらす。
+        text = self.meta_path.read_text(encoding="utf-8")
+        text = text.replace('"10": {', '"10":  {', 1).replace('"year_published": 2099', '"year_published": 3099')
+        self.assertTrue(text.endswith("\n}\n"))
+        self.meta_path.write_text(text[:-3] + "}\n", encoding="utf-8")
+
+        macros = _load_env(self.meta_path)
+        self.assertIn('data-year="3099"', macros["game_card"]("99", "T", "D", "", "T/"))
+        self.assertIn('data-year="2001"', macros["game_card"]("1", "T", "D", "", "T/"))
+        import main as main_module
+
+        self.assertIsNotNone(main_module._field_table._lookup.__self__._fallback)
+
+    def test_rewriting_json_keeps_open_index_readable_until_post_build(self):
+        from scripts import bgg_fetch
+
+        index = self.main._meta_source
+        self.assertIsInstance(index, self.main.BggMetaIndex)
+        # 開いている索引の裏で、小さな内容に書き直す（以前はその場で切り詰めて SIGBUS になった）。
+        bgg_fetch.write_json(self.meta_path, {"1": {"year_published": 1999}}, self.meta_path.with_suffix(".idx"))
+        self.assertEqual(index.get("199"), self.meta["199"])
+
+        self.main.on_post_build(None)
+        self.assertIsNone(self.main._meta_source)
+        self.assertTrue(index._json.closed)
+        self.assertTrue(index._index.closed)
+
+        macros = _load_env(self.meta_path)
+        self.assertIn('data-year="1999"', macros["game_card"]("1", "T", "D", "", "T/"))
+        self.assertIn('data-year=""', macros["game_card"]("199", "T", "D", "", "T/"))
+
+
+class MacroProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.output = Path(self.td.name) / "profile" / "macros.json"
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_disabled_by_default(self):
+        with patch.dict("os.environ", {"MACRO_PROFILE": ""}):
+            macros = _load_env()
+        import main as main_module
+
+        self.assertIsNone(main_module._profiler)
+        self.assertFalse(hasattr(macros["game_card"], "__wrapped__"))
+        main_module.on_post_build(None)
+
+    def test_env_var_enables_profiling_and_post_build_writes_json(self):
+        with patch.dict("os.environ", {"MACRO_PROFILE": str(self.output)}):
+            macros = _load_env()
+        import main as main_module
+
+        plain = macros["icon"].__wrapped__("material-train")
+        for _ in range(3):
+            self.assertEqual(macros["icon"]("material-train"), plain)
+        macros["game_card"]("404", "T", "D", "", "T/")
+        with self.assertLogs("mkdocs.plugins.macros", level="INFO"):
+            main_module.on_post_build(None)
+
+        report = json.loads(self.output.read_text(encoding="utf-8"))
+        icon = report["macros"]["icon"]
+        # game_card は icon マクロを経由しないので、直接の呼び出しだけが数えられる。
+        self.assertEqual(icon["calls"], 3)
+        self.assertEqual(icon["output_bytes"], 3 * len(plain.encode("utf-8")))
+        self.assertEqual(report["macros"]["game_card"]["calls"], 1)
+        self.assertEqual(report["macros"]["download_link"]["calls"], 0)
+        self.assertGreaterEqual(icon["total_ms"], icon["p95_ms"])
+        self.assertEqual(report["field_table"]["misses"], 1)
+
+    def test_mkdocs_extra_enables_profiling(self):
+        with patch.dict("os.environ", {"MACRO_PROFILE": ""}):
+            _load_env(conf={"extra": {"macro_profile": str(self.output)}})
+        import main as main_module
+
+        self.assertEqual(main_module._profiler.output, self.output)
+
+    def test_real_mkdocs_config_enables_profiling(self):
+        from mkdocs.config import load_config
+
+        root = Path(self.td.name)
+        (root / "docs").mkdir()
+        config_path = root / "mkdocs.yml"
+        config_path.write_text(
+            f"site_name: Test\nextra:\n  macro_profile: {self.output.as_posix()}\n",
+            encoding="utf-8",
+        )
+        config = load_config(config_file=str(config_path))
+        # extra は dict ではなく SubConfig として渡される。
+        self.assertNotIsInstance(config["extra"], dict)
+        with patch.dict("os.environ", {"MACRO_PROFILE": ""}):
+            _load_env(conf=config)
+        import main as main_module
+
+        self.assertEqual(main_module._profiler.output, self.output)
+
+
+class ShardedMetaTests(unittest.TestCase):
+    def setUp(self):
+        from scripts import bgg_fetch
+
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        self.meta_path = root / "bgg-meta.json"
+        meta = {str(bgg_id): {"year_published": 2000 + bgg_id} for bgg_id in range(1, 100)}
+        bgg_fetch.write_sharded(root / "bgg-meta", meta)
+        # 分割レイアウトがあれば、古い単一ファイルより優先される。
+        self.meta_path.write_text(json.dumps({"5": {"year_published": 1900}}), encoding="utf-8")
+        self.macros = _load_env(self.meta_path, root / "covers")
+        import main as main_module
+
+        self.main = main_module
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_only_referenced_shards_are_loaded(self):
+        self.assertIn('data-year="2005"', self.macros["game_card"]("5", "T", "D", "", "T/"))
+        self.assertIn('data-year="2005"', self.macros["game_card"]("5", "T", "D", "", "T/"))
+        self.assertIsNone(self.main._field_table.get("404"))
+        self.assertEqual(self.main._field_table._lookup.__self__.shards_loaded, 1)
+
+    def test_broken_shard_index_falls_back_to_json(self):
+        (Path(self.td.name) / "bgg-meta" / "index.json").write_text("{", encoding="utf-8")
+        macros = _load_env(self.meta_path)
+        self.assertIn('data-year="1900"', macros["game_card"]("5", "T", "D", "", "T/"))
+
+
+GOLDEN_DIR = Path(__file__).parent / "fixtures" / "card_golden"
+
+
+class CardGoldenTests(unittest.TestCase):
+    """fixtures/card_golden/cases.json の出力と1バイトも違わないことを確かめる。
+
+    アイコンの SVG は mkdocs-material の版で変わるので、期待値では [[icon:<name>]] にしてある。
+    """
+
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.golden = json.loads((GOLDEN_DIR / "cases.json").read_text(encoding="utf-8"))
+        covers = Path(self.td.name)
+        for name in self.golden["covers"]:
+            (covers / name).write_bytes(b"RIFF")
+        self.macros = _load_env(GOLDEN_DIR / "bgg-meta.json", covers)
+        import main as main_module
+
+        self.icons = {
+            f"[[icon:{name}]]": main_module._render_icon(name, None)
+            for name, _ in main_module.PREWARM_ICONS
+        }
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def _expected(self, html: str) -> str:
+        for token, svg in self.icons.items():
+            html = html.replace(token, svg)
+        return html
+
+    def test_macros_match_golden_output(self):
+        for case in self.golden["cases"]:
+            with self.subTest(macro=case["macro"], args=case["args"]):
+                result = self.macros[case["macro"]](*case["args"])
+                self.assertEqual(result, self._expected(case["html"]))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,12 @@ import tempfile
 import unittest
 from pathlib import Path
 
-from scripts.validate_structure import run_validation, validate_game_file
+from scripts.validate_structure import (
+    ValidationIssue,
+    run_validation,
+    scan_game_content,
+    validate_game_file,
+)
 
 
 def _write(path: Path, content: str) -> None:
@@ -93,6 +98,61 @@ class ValidateStructureTests(unittest.TestCase):
             self.assertEqual(result.errors, [])
             self.assertEqual(result.warnings, [])
 
+    def test_scan_collects_structure_in_one_pass(self) -> None:
+        content = """# 18Scan サマリー
+
+<div class="actions">
+  {{ print_button() }}
+  <a href="../../assets/18Scan.txt">DL</a>
+</div>
+
+=== "SR"
+    text
+=== "OR"
+"""
+        scan = scan_game_content(content)
+        self.assertTrue(scan.has_title)
+        self.assertIn("print_button", scan.action_body)
+        self.assertIsNone(scan.download_filename)
+        self.assertEqual(scan.download_href, "../../assets/18Scan.txt")
+        self.assertEqual(scan.tabs, ["SR", "OR"])
+
+    def test_scan_matches_tabs_and_title_within_single_lines(self) -> None:
+        # 先頭行・末尾行・連続行も拾う。
+        content = '=== "SR"\n=== "OR"\n# 18Scan サマリー \t\r\n=== "Setup"'
+        scan = scan_game_content(content)
+        self.assertEqual(scan.tabs, ["SR", "OR", "Setup"])
+        self.assertTrue(scan.has_title)
+
+    def test_scan_rejects_tabs_and_titles_split_across_lines(self) -> None:
+        # 見出しもタブも1行の構文なので、改行をまたぐものは数えない
+        # （以前の全文 \s パターンはこれらも一致させていた）。
+        cases = {
+            "# 18Scan\nサマリー": ([], False),
+            "#\n18Scan サマリー": ([], False),
+            '=== "SR\nOR"': ([], False),
+            '===\n"SR"': ([], False),
+        }
+        for content, (tabs, has_title) in cases.items():
+            with self.subTest(content=content):
+                scan = scan_game_content(content)
+                self.assertEqual(scan.tabs, tabs)
+                self.assertEqual(scan.has_title, has_title)
+
+    def test_validate_game_file_runs_custom_rules(self) -> None:
+        class NoTodoRule:
+            def check(self, path, scan):
+                if "TODO" in scan.tabs:
+                    yield ValidationIssue(path=path, level="WARN", message="TODO tab")
+
+        content = '# 18Todo サマリー\n\n=== "TODO"\n    text\n'
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "18Todo.md"
+            _write(path, content)
+            result = validate_game_file(path, rules=[NoTodoRule()])
+            self.assertEqual(result.errors, [])
+            self.assertEqual([issue.message for issue in result.warnings], ["TODO tab"])
+
     def test_run_validation_checks_pages_and_index_alignment(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             root = Path(td)
@@ -173,6 +233,43 @@ nav:
             )
             self.assertEqual(result.errors, [])
 
+    def test_run_validation_reports_duplicate_index_entries_with_lines(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            games = Path(td) / "docs" / "games"
+            _write(
+                games / "A.md",
+                """# A サマリー
+
+<div class="actions">
+  {{ print_button() }}
+  {{ download_link("A.txt") }}
+</div>
+
+=== "SR"
+=== "OR"
+=== "セットアップ / 早見"
+""",
+            )
+            _write(games / ".pages", "title: ゲーム一覧\nnav:\n  - index.md\n  - A.md\n")
+            _write(
+                games / "index.md",
+                """# ゲーム一覧
+{{ game_card("1", "A", "Desc", "", "A/") }}
+
+{{ game_actions("1", "A/") }}
+{{ game_card("1", "A", "Desc", "", "A/") }}
+""",
+            )
+
+            result = run_validation(
+                games_dir=games,
+                pages_path=games / ".pages",
+                index_path=games / "index.md",
+            )
+            self.assertEqual(result.errors, [])
+            self.assertEqual(len(result.warnings), 1)
+            self.assertIn("A (行 2, 4, 5)", result.warnings[0].message)
+
     def test_run_validation_detects_alignment_mismatch(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             root = Path(td)
@@ -211,5 +308,70 @@ nav:
             self.assertIn("ゲーム一覧(index.md)に不足しているゲーム", messages)
 
 
+class CachedValidationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        root = Path(self.td.name)
+        self.games = root / "docs" / "games"
+        self.cache_path = root / ".cache" / "validate.json"
+        stems = ["A", "B", "C"]
+        for stem in stems:
+            _write(
+                self.games / f"{stem}.md",
+                f"""# {stem} サマリー
+
+<div class="actions">
+  {{{{ print_button() }}}}
+  {{{{ download_link("{stem}.txt") }}}}
+</div>
+
+=== "SR"
+=== "OR"
+=== "Extra"
+""",
+            )
+        nav = "".join(f"  - {stem}.md\n" for stem in stems)
+        _write(self.games / ".pages", f"title: ゲーム一覧\nnav:\n  - index.md\n{nav}")
+        cards = "".join(f'{{{{ game_actions("1", "{stem}/") }}}}\n' for stem in stems)
+        _write(self.games / "index.md", f"# ゲーム一覧\n{cards}")
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def _run(self, **kwargs):
+        return run_validation(
+            games_dir=self.games,
+            pages_path=self.games / ".pages",
+            index_path=self.games / "index.md",
+            **kwargs,
+        )
+
+    @staticmethod
+    def _formatted(summary):
+        return [issue.format() for issue in (*summary.errors, *summary.warnings)]
+
+    def test_cache_reuses_results_until_content_changes(self) -> None:
+        first = self._run(cache_path=self.cache_path)
+        second = self._run(cache_path=self.cache_path)
+        self.assertEqual(self._formatted(first), self._formatted(second))
+        self.assertEqual([timing.cached for timing in first.timings], [False] * 3)
+        self.assertEqual([timing.cached for timing in second.timings], [True] * 3)
+
+        path = self.games / "B.md"
+        path.write_text(path.read_text(encoding="utf-8") + "=== \"セットアップ / 早見\"\n", encoding="utf-8")
+        third = self._run(cache_path=self.cache_path)
+        self.assertEqual(
+            {timing.path.name: timing.cached for timing in third.timings},
+            {"A.md": True, "B.md": False, "C.md": True},
+        )
+        self.assertEqual(len(third.errors), len(first.errors) - 1)
+
+    def test_parallel_validation_matches_serial(self) -> None:
+        serial = self._run()
+        parallel = self._run(jobs=2)
+        self.assertEqual(self._formatted(parallel), self._formatted(serial))
+        self.assertEqual(len(parallel.timings), 3)
+
+
 if __name__ == "__main__":
     unittest.main()